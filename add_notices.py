@@ -1,83 +1,92 @@
-import requests
-from bs4 import BeautifulSoup
 from datetime import datetime
+from itertools import islice
 import sqlite3
 import os
+import sys
 
-def fetch_ptu_notices():
-    # URL of the PTU noticeboard
-    url = "https://ptu.ac.in/noticeboard-main/"
-    
+from noticeboard import NoticeboardFetcher, iter_notice_rows, normalize_notice_title
+
+# Validators of the last page this script stored, so a rerun on an
+# unchanged noticeboard does no parsing or database work
+STATE_PATH = os.path.join(os.path.dirname(__file__), 'data', '.noticeboard_state.json')
+
+def fetch_ptu_notices(fetcher):
+    """Return (page, notices) for the latest 5 notices, or (None, []) if the page is unchanged.
+
+    Network and HTTP errors are raised, as is a page with no notices on it,
+    so a failed fetch is never mistaken for an unchanged noticeboard.
+    """
+    page = fetcher.fetch()
+    if page is None:
+        return None, []
+
+    notices = []
+    for title, date_str, link in islice(iter_notice_rows(page.html), 5):  # Get first 5 rows
+        # Convert date string to datetime object
+        try:
+            date_posted = datetime.strptime(date_str, '%d/%m/%Y')
+        except ValueError:
+            date_posted = datetime.now()
+
+        notices.append({
+            'title': title,
+            'date_posted': date_posted,
+            'link': link or "#"
+        })
+
+    # Replacing the stored notices with nothing would empty the table
+    if not notices:
+        raise ValueError("no notices found on the noticeboard page")
+
+    return page, notices
+
+def add_notices_to_db(db_path=None, fetcher=None):
+    """Replace the stored notices with the latest ones; returns False on failure."""
+    # Get the absolute path of the database file
+    db_path = db_path or os.path.join(os.path.dirname(__file__), 'student_portal.db')
+    fetcher = fetcher or NoticeboardFetcher(state_path=STATE_PATH)
+
+    # Fetch notices from PTU website
     try:
-        # Send GET request to the URL
-        response = requests.get(url)
-        response.raise_for_status()
-        
-        # Parse the HTML content
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Find the table containing notices
-        notices = []
-        table = soup.find('table')
-        if table:
-            rows = table.find_all('tr')[1:6]  # Get first 5 rows excluding header
-            for row in rows:
-                cols = row.find_all('td')
-                if len(cols) >= 2:  # Ensure we have at least title and date
-                    title = cols[0].text.strip()
-                    date_str = cols[1].text.strip()
-                    link = cols[2].find('a')['href'] if cols[2].find('a') else "#"
-                    
-                    # Convert date string to datetime object
-                    try:
-                        date_posted = datetime.strptime(date_str, '%d/%m/%Y')
-                    except ValueError:
-                        date_posted = datetime.now()
-                    
-                    notices.append({
-                        'title': title,
-                        'date_posted': date_posted,
-                        'link': link
-                    })
-        
-        return notices
-    
+        page, notices = fetch_ptu_notices(fetcher)
     except Exception as e:
         print(f"Error fetching notices: {e}")
-        return []
+        return False
+    if page is None:
+        print("No changes on the noticeboard since the last run")
+        return True
 
-def add_notices_to_db():
-    # Get the absolute path of the database file
-    db_path = os.path.join(os.path.dirname(__file__), 'student_portal.db')
-    
     # Connect to the database
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
-    
+
     try:
-        # Fetch notices from PTU website
-        notices = fetch_ptu_notices()
-        
         # Clear existing notices
         cursor.execute("DELETE FROM notice")
-        
+
         # Add new notices
-        for notice in notices:
-            cursor.execute("""
-                INSERT INTO notice (title, date_posted, link, created_at, is_new)
-                VALUES (?, ?, ?, datetime('now'), 1)
-            """, (notice['title'], notice['date_posted'], notice['link']))
-        
+        cursor.executemany("""
+            INSERT INTO notice (title, title_key, date_posted, link, created_at)
+            VALUES (?, ?, ?, ?, datetime('now'))
+            ON CONFLICT (title_key) DO NOTHING
+        """, [
+            (notice['title'], normalize_notice_title(notice['title']), notice['date_posted'], notice['link'])
+            for notice in notices
+        ])
+
         # Commit the changes
         conn.commit()
+        fetcher.remember(page)
         print(f"Successfully added {len(notices)} notices to the database")
-        
+        return True
+
     except Exception as e:
         print(f"Error adding notices to database: {e}")
         conn.rollback()
-    
+        return False
+
     finally:
         conn.close()
 
 if __name__ == "__main__":
-    add_notices_to_db() 
\ No newline at end of file
+    sys.exit(0 if add_notices_to_db() else 1)
@@ -1,18 +1,30 @@
-from flask import Flask, render_template, redirect, url_for, flash, request, jsonify, session, send_file
+from flask import Flask, render_template, redirect, url_for, flash, request, jsonify, session, send_file, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import wraps
 import os
 import json
+import sqlite3
 import pytz
-from sqlalchemy import create_engine
+from sqlalchemy import case, create_engine, func, literal, select, tuple_
 from sqlalchemy.exc import OperationalError
-import requests
-from bs4 import BeautifulSoup
-from chatbot.chatbot import get_bot_response
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from chatbot.chatbot import (
+    get_bot_reply, get_bot_replies, request_knowledge_base_reload, start_knowledge_base_watcher,
+    export_metrics as export_chatbot_metrics, is_ready as chatbot_is_ready, notice_cache, warmup,
+)
 from chatbot.ptu_utils import PTUUtils
+from noticeboard import NoticeboardFetcher, iter_notice_rows, normalize_notice_title
+from job_leader import JobLeader
+from write_behind import WriteBehindBuffer
+from sqlite_profile import ENGINE_OPTIONS, WalCheckpointer, apply_sqlite_profile
+from search_index import (
+    SEARCH_TABLES, index_new_rows, install_search_index, rebuild_search_index,
+    search_chat_history, search_notices, search_tickets,
+)
 from flask_migrate import Migrate
 from student_portal import models
 
@@ -20,16 +32,16 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 app = Flask(__name__)
 
 app.config['SECRET_KEY'] = 'your-secret-key'
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.join(basedir, "student_portal.db")}'
+# STUDENT_PORTAL_DB points the app at another database file, e.g. a scratch copy
+DATABASE_PATH = os.environ.get('STUDENT_PORTAL_DB', os.path.join(basedir, 'student_portal.db'))
+app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{DATABASE_PATH}'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(ENGINE_OPTIONS)
 app.config['UPLOAD_FOLDER'] = os.path.join(basedir, 'static', 'profile_photos')
 
 # Database initialize
 db = SQLAlchemy(app)
 migrate = Migrate(app, db)
-# Create tables inside app context
-with app.app_context():
-    db.create_all()
 
 # Set timezone
 timezone = pytz.timezone('Asia/Kolkata')
@@ -37,6 +49,8 @@ timezone = pytz.timezone('Asia/Kolkata')
 # Configure scheduler with timezone
 from apscheduler.schedulers.background import BackgroundScheduler
 scheduler = BackgroundScheduler(timezone=timezone)
+# Every worker runs a scheduler; only the holder of this lease runs its jobs
+job_leader = JobLeader(DATABASE_PATH)
 
 # Ensure the upload folder exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -47,6 +61,9 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 db = SQLAlchemy(app)
+# WAL, busy timeout and cache settings on every pooled connection
+with app.app_context():
+    apply_sqlite_profile(db.engine)
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 
@@ -80,6 +97,10 @@ class Admin(UserMixin, db.Model):
     password = db.Column(db.String(200), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    def get_id(self):
+        # Admin and user ids overlap, so the session records which table the id is from
+        return f'{ADMIN_ID_PREFIX}{self.id}'
+
 class SupportTicket(db.Model):
     _tablename_ = 'support_ticket'
     
@@ -96,6 +117,20 @@ class SupportTicket(db.Model):
     archived_at = db.Column(db.DateTime, nullable=True)
     starred = db.Column(db.Boolean, default=False)
 
+    # Partial indexes in the order of each support_tickets() folder; a
+    # ticket is only stored in the index of its own folder. Starred tickets
+    # are read from the inbox index.
+    __table_args__ = (
+        db.Index('ix_support_ticket_inbox', 'user_id', 'created_at',
+                 sqlite_where=db.text('deleted = 0 AND archived = 0')),
+        db.Index('ix_support_ticket_archive', 'user_id', 'archived_at',
+                 sqlite_where=db.text('archived = 1 AND deleted = 0')),
+        db.Index('ix_support_ticket_trash', 'user_id', 'deleted_at',
+                 sqlite_where=db.text('deleted = 1')),
+        # Covers the folder counts of rebuild_folder_counts()
+        db.Index('ix_support_ticket_user_folder', 'user_id', 'deleted', 'archived', 'starred'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -108,6 +143,73 @@ class SupportTicket(db.Model):
             'starred': self.starred
         }
 
+class TicketFolderCount(db.Model):
+    """Cached number of tickets in each sidebar folder of one user."""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    inbox = db.Column(db.Integer, nullable=False, default=0)
+    starred = db.Column(db.Integer, nullable=False, default=0)
+    archive = db.Column(db.Integer, nullable=False, default=0)
+    trash = db.Column(db.Integer, nullable=False, default=0)
+    rebuilt_at = db.Column(db.DateTime, nullable=False)
+
+TICKET_FOLDERS = ('inbox', 'starred', 'archive', 'trash')
+# Counters are recounted at least this often, in case a ticket was changed
+# by something that does not call shift_folder_counts()
+FOLDER_COUNTS_MAX_AGE = timedelta(hours=1)
+
+def ticket_folders(ticket):
+    """The folders support_tickets() lists a ticket in."""
+    if ticket.deleted:
+        return {'trash'}
+    if ticket.archived:
+        return {'archive'}
+    return {'inbox', 'starred'} if ticket.starred else {'inbox'}
+
+def shift_folder_counts(user_id, before=(), after=()):
+    """Move a ticket between the cached counters, in the caller's transaction."""
+    deltas = {folder: (folder in after) - (folder in before) for folder in TICKET_FOLDERS}
+    changes = {folder: getattr(TicketFolderCount, folder) + delta for folder, delta in deltas.items() if delta}
+    if changes:
+        # No row yet is fine: the next read counts from the tickets
+        db.session.execute(
+            TicketFolderCount.__table__.update().where(TicketFolderCount.user_id == user_id).values(changes)
+        )
+
+def rebuild_folder_counts(user_id):
+    """Recount a user's folders with one aggregate query and store the result."""
+    def tickets_where(condition):
+        return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+    in_inbox = db.and_(~SupportTicket.deleted, ~SupportTicket.archived)
+    counts = select(
+        literal(user_id),
+        tickets_where(in_inbox),
+        tickets_where(db.and_(in_inbox, SupportTicket.starred)),
+        tickets_where(db.and_(~SupportTicket.deleted, SupportTicket.archived)),
+        tickets_where(SupportTicket.deleted),
+        literal(datetime.utcnow(), type_=db.DateTime),
+    ).where(SupportTicket.user_id == user_id)
+    # Counting and storing in one statement, so a ticket changed meanwhile
+    # by another worker cannot be missed
+    statement = sqlite_insert(TicketFolderCount.__table__).from_select(
+        ['user_id', *TICKET_FOLDERS, 'rebuilt_at'], counts
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=['user_id'],
+        set_={column: statement.excluded[column] for column in (*TICKET_FOLDERS, 'rebuilt_at')},
+    )
+    db.session.execute(statement)
+    db.session.commit()
+
+def ticket_folder_counts(user_id):
+    """Ticket count per folder from the cache, recounted when missing, stale or off."""
+    cached = db.session.get(TicketFolderCount, user_id, populate_existing=True)
+    if (cached is None or cached.rebuilt_at < datetime.utcnow() - FOLDER_COUNTS_MAX_AGE
+            or min(getattr(cached, folder) for folder in TICKET_FOLDERS) < 0):
+        rebuild_folder_counts(user_id)
+        cached = db.session.get(TicketFolderCount, user_id, populate_existing=True)
+    return {folder: getattr(cached, folder) for folder in TICKET_FOLDERS}
+
 class ChatHistory(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -115,25 +217,107 @@ class ChatHistory(db.Model):
     response = db.Column(db.Text, nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # A user's history in (timestamp, id) order; the rowid ends every index entry
+    __table_args__ = (db.Index('ix_chat_history_user_timestamp', 'user_id', 'timestamp'),)
+
+# Rows per multi-row INSERT: at 4 bound variables a row this stays under
+# SQLite's limit of 999 variables per statement (32766 from 3.32)
+CHAT_HISTORY_INSERT_ROWS = 200
+
+def insert_chat_history(rows):
+    """Store buffered chat turns with multi-row INSERTs, and index them, in one transaction."""
+    # A connection of its own: flush() may run inside a request, whose session must not be touched
+    with db.get_engine(app).begin() as connection:
+        first_id = None
+        for i in range(0, len(rows), CHAT_HISTORY_INSERT_ROWS):
+            chunk = rows[i:i + CHAT_HISTORY_INSERT_ROWS]
+            result = connection.execute(ChatHistory.__table__.insert().values(chunk))
+            if first_id is None:
+                # The write lock is held from here on, so the batch gets
+                # consecutive ids ending at this statement's last one
+                first_id = result.lastrowid - len(chunk) + 1
+        # chat_history has no insert trigger; see search_index.BATCH_INDEXED
+        index_new_rows(connection.connection, 'chat_history', first_id)
+
+# Chat turns are saved after the reply is sent, in batches of up to 100 or
+# once a second; see WriteBehindBuffer for what a crash can lose
+chat_history_buffer = WriteBehindBuffer(insert_chat_history, max_rows=100, max_delay=1.0, name='chat-history-writer')
+
 class Notice(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(500), nullable=False)
-    date_posted = db.Column(db.DateTime, nullable=False)
+    # normalize_notice_title(title); one row per notice on the noticeboard
+    title_key = db.Column(db.String(500), nullable=False, unique=True)
+    date_posted = db.Column(db.DateTime, nullable=False, index=True)
     link = db.Column(db.String(500), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+def create_tables(rebuild_search=False):
+    """Create missing tables, then the full-text search index over them.
+
+    A search table created here is filled from the rows its table already
+    holds; rebuild_search=True re-indexes every table, e.g. after drop_all().
+    """
+    db.create_all()
+    conn = sqlite3.connect(DATABASE_PATH)
+    try:
+        created = install_search_index(conn)
+        rebuild = list(SEARCH_TABLES) if rebuild_search else created
+        if rebuild:
+            rebuild_search_index(conn, rebuild)
+    finally:
+        conn.close()
+
+# Create tables inside app context
+with app.app_context():
+    create_tables()
+
+# Session ids of admins, see Admin.get_id(); plain ids are users
+ADMIN_ID_PREFIX = 'admin:'
+
 @login_manager.user_loader
 def load_user(user_id):
-    user = User.query.get(int(user_id))
-    if user:
-        return user
-    return Admin.query.get(int(user_id))
+    if user_id.startswith(ADMIN_ID_PREFIX):
+        return Admin.query.get(int(user_id[len(ADMIN_ID_PREFIX):]))
+    return User.query.get(int(user_id))
+
+def is_admin():
+    return isinstance(current_user._get_current_object(), Admin)
+
+def admin_required(view):
+    """login_required, and a 403 for anyone signed in as a student."""
+    @wraps(view)
+    @login_required
+    def wrapped(*args, **kwargs):
+        if not is_admin():
+            return jsonify({'success': False, 'error': 'Admin access required'}), 403
+        return view(*args, **kwargs)
+    return wrapped
+
+# Pages an admin session may open; student pages key everything on
+# current_user.id, which for an admin is another table's id
+ADMIN_ENDPOINTS = {'logout', 'static', 'healthz', 'index'}
+
+@app.before_request
+def keep_admins_to_admin_pages():
+    if request.path.startswith('/admin/') or request.endpoint in ADMIN_ENDPOINTS:
+        return None
+    if current_user.is_authenticated and is_admin():
+        return jsonify({'success': False, 'error': 'Student access required'}), 403
+    return None
 
 # Routes
 @app.route('/')
 def index():
     return render_template('home.html')
 
+@app.route('/healthz')
+def healthz():
+    # Load balancers should only route to workers whose chatbot is warm
+    if chatbot_is_ready():
+        return jsonify({'status': 'ok', 'chatbot_ready': True})
+    return jsonify({'status': 'starting', 'chatbot_ready': False}), 503
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
@@ -153,6 +337,25 @@ def login():
     
     return render_template('login.html')
 
+@app.route('/admin/login', methods=['GET', 'POST'])
+def admin_login():
+    if current_user.is_authenticated and is_admin():
+        return redirect(url_for('chatbot_metrics'))
+    
+    if request.method == 'POST':
+        username = request.form.get('username')
+        password = request.form.get('password')
+        
+        admin = Admin.query.filter_by(username=username).first()
+        
+        if admin and check_password_hash(admin.password, password):
+            login_user(admin)
+            return redirect(url_for('chatbot_metrics'))
+        
+        flash('Invalid username or password', 'error')
+    
+    return render_template('login.html', login_endpoint='admin_login')
+
 @app.route('/register', methods=['GET', 'POST'])
 def register():
     if current_user.is_authenticated:
@@ -255,6 +458,7 @@ def support_tickets():
             
             try:
                 db.session.add(ticket)
+                shift_folder_counts(current_user.id, after=ticket_folders(ticket))
                 db.session.commit()
                 flash('Query created successfully!', 'success')
             except Exception as e:
@@ -291,7 +495,8 @@ def support_tickets():
             archived=False
         ).order_by(SupportTicket.created_at.desc()).all()
     
-    return render_template('support_tickets.html', tickets=tickets, view=view)
+    return render_template('support_tickets.html', tickets=tickets, view=view,
+                           folder_counts=ticket_folder_counts(current_user.id))
 
 @app.route('/logout')
 @login_required
@@ -307,19 +512,71 @@ def chat():
         message = data.get('message', '')
         if message:
             # Use chatbot's AI logic
-            response = get_bot_response(message)
-            # Save chat history in DB (as before)
-            chat_history = ChatHistory(
-                user_id=current_user.id,
-                message=message,
-                response=response,
-                timestamp=datetime.utcnow()
-            )
-            db.session.add(chat_history)
-            db.session.commit()
-            return jsonify({'response': response})
+            reply = get_bot_reply(message)
+            response = reply['response']
+            # Save chat history in DB; written in the background with other turns
+            chat_history_buffer.append({
+                'user_id': current_user.id,
+                'message': message,
+                'response': response,
+                'timestamp': datetime.utcnow(),
+            })
+            # Top CSV candidates let the UI offer "did you mean"
+            return jsonify({'response': response, 'suggestions': reply['suggestions']})
     return render_template('chat.html')
 
+# Largest number of messages accepted by one /chat/batch request
+MAX_BATCH_MESSAGES = 1000
+
+@app.route('/chat/batch', methods=['POST'])
+@login_required
+def chat_batch():
+    data = request.get_json(silent=True) or {}
+    messages = data.get('messages')
+    if not isinstance(messages, list) or not all(isinstance(message, str) for message in messages):
+        return jsonify({'success': False, 'error': 'messages must be a list of strings'}), 400
+    if len(messages) > MAX_BATCH_MESSAGES:
+        return jsonify({'success': False, 'error': f'At most {MAX_BATCH_MESSAGES} messages per batch'}), 400
+    
+    # Replays are answered in one vectorized pass and not saved to chat history
+    replies = get_bot_replies([message.strip() for message in messages])
+    return jsonify({
+        'success': True,
+        'responses': [
+            {'message': message, 'response': reply['response'], 'suggestions': reply['suggestions']}
+            for message, reply in zip(messages, replies)
+        ]
+    })
+
+@app.route('/admin/reload_knowledge_base', methods=['POST'])
+@admin_required
+def reload_knowledge_base():
+    # Rebuilt in the background and swapped in; every worker picks it up
+    request_knowledge_base_reload()
+    return jsonify({'success': True, 'message': 'Knowledge base reload started'}), 202
+
+@app.route('/admin/chatbot_metrics')
+@admin_required
+def chatbot_metrics():
+    # Latency histograms per answering stage and route, plus cache counters
+    return jsonify(export_chatbot_metrics())
+
+@app.route('/admin/scheduler_status')
+@admin_required
+def scheduler_status():
+    # Which process holds the scheduler lease, and each job's last run
+    return jsonify(job_leader.status())
+
+@app.route('/admin/storage_status')
+@admin_required
+def storage_status():
+    # Connection settings as SQLite reports them, and the WAL size; the
+    # last checkpoint is only known in the process holding the scheduler lease
+    connection = db.session.connection()
+    pragmas = {name: connection.exec_driver_sql(f'PRAGMA {name}').scalar() for name in (
+        'journal_mode', 'synchronous', 'busy_timeout', 'mmap_size', 'cache_size', 'temp_store')}
+    return jsonify({'pragmas': pragmas, 'wal': wal_checkpointer.stats(), 'is_scheduler_leader': job_leader.is_leader()})
+
 @app.route('/upload_profile_photo', methods=['POST'])
 @login_required
 def upload_profile_photo():
@@ -379,64 +636,128 @@ def process_message(message):
     else:
         return "I'm not sure I understand. Could you please rephrase your question or try asking about admissions, fees, exams, or other university services?"
 
-def fetch_ptu_notices():
+# Shared connection pool and ETag/Last-Modified state for noticeboard scrapes
+notice_fetcher = NoticeboardFetcher()
+
+def save_notices(scraped):
+    """Insert new notices and update changed ones in a single transaction.
+
+    `scraped` is any iterable of (title, date_posted, link). Existing rows are
+    looked up with one IN query and new rows go in with one
+    INSERT ... ON CONFLICT DO NOTHING, so a concurrent refresh cannot
+    duplicate a notice. Returns {'inserted', 'updated', 'unchanged'} counts.
+    """
+    # The same notice listed twice on the page counts once; the last listing wins
+    by_key = {}
+    for title, date_posted, link in scraped:
+        by_key[normalize_notice_title(title)] = (title, date_posted, link or '')
+    
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+    keys = list(by_key)
+    existing = {}
+    # Stay under SQLite's limit on bound parameters per statement
+    for start in range(0, len(keys), 500):
+        for notice in Notice.query.filter(Notice.title_key.in_(keys[start:start + 500])):
+            existing[notice.title_key] = notice
+    
+    new_rows = []
+    for key, (title, date_posted, link) in by_key.items():
+        notice = existing.get(key)
+        if notice is None:
+            new_rows.append({'title': title, 'title_key': key, 'date_posted': date_posted, 'link': link})
+        elif notice.date_posted != date_posted or notice.link != link:
+            notice.date_posted = date_posted
+            notice.link = link
+            counts['updated'] += 1
+        else:
+            counts['unchanged'] += 1
+    
     try:
-        # Fetch the webpage content
-        url = 'https://ptu.ac.in/noticeboard-main/'
-        response = requests.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Find the notice table
-        notice_table = soup.find('table')
-        if not notice_table:
-            print("No notice table found")
-            return []
-        
-        notices = []
-        rows = notice_table.find_all('tr')[1:]  # Skip header row
-        
-        for row in rows:
-            cols = row.find_all('td')
-            if len(cols) >= 3:
-                title = cols[0].text.strip()
-                date_str = cols[1].text.strip()
-                link = cols[2].find('a')['href'] if cols[2].find('a') else None
-                
-                if title and date_str:
-                    try:
-                        # Convert date string to datetime object
-                        date_posted = datetime.strptime(date_str, '%d/%m/%Y')
-                        
-                        # Check if notice already exists
-                        existing_notice = Notice.query.filter_by(title=title).first()
-                        if not existing_notice:
-                            notice = Notice(
-                                title=title,
-                                date_posted=date_posted,
-                                link=link
-                            )
-                            notices.append(notice)
-                    except ValueError as e:
-                        print(f"Error parsing date {date_str}: {e}")
-                        continue
-        
-        if notices:
+        if new_rows:
+            result = db.session.execute(
+                sqlite_insert(Notice.__table__).on_conflict_do_nothing(index_elements=['title_key']),
+                new_rows,
+            )
+            counts['inserted'] = result.rowcount
+            counts['unchanged'] += len(new_rows) - result.rowcount
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return counts
+
+def parse_notices(html):
+    """Yield (title, date_posted, link) for each noticeboard row with a title and valid date."""
+    for title, date_str, link in iter_notice_rows(html):
+        if title and date_str:
             try:
-                db.session.bulk_save_objects(notices)
-                db.session.commit()
-                print(f"Added {len(notices)} new notices")
-            except Exception as e:
-                print(f"Error saving notices: {e}")
-                db.session.rollback()
+                # Convert date string to datetime object
+                date_posted = datetime.strptime(date_str, '%d/%m/%Y')
+            except ValueError as e:
+                print(f"Error parsing date {date_str}: {e}")
+                continue
+            yield title, date_posted, link
+
+def fetch_ptu_notices():
+    """Scrape the noticeboard and save it; returns the save_notices() counts, or None on error.
+
+    When the page has not changed since the last saved scrape nothing is
+    parsed or written and the counts have 'page_unchanged' set.
+    """
+    try:
+        page = notice_fetcher.fetch()
+        if page is None:
+            print("Noticeboard unchanged since the last refresh")
+            return {'inserted': 0, 'updated': 0, 'unchanged': 0, 'page_unchanged': True}
         
-        return notices
+        # Rows are parsed and handed to save_notices one at a time
+        counts = save_notices(parse_notices(page.html))
+        notice_fetcher.remember(page)
+        print(f"Notices: {counts['inserted']} added, {counts['updated']} updated, {counts['unchanged']} unchanged")
+        return counts
     except Exception as e:
         print(f"Error fetching notices: {e}")
-        return []
+        return None
+
+def refresh_notices_job():
+    """Scheduled notice refresh; raises so a failed run is recorded as one."""
+    if fetch_ptu_notices() is None:
+        raise RuntimeError("Notice refresh failed")
 
 # Add scheduler to fetch notices periodically
-scheduler.add_job(func=fetch_ptu_notices, trigger="interval", hours=6)
-scheduler.start()
+scheduler.add_job(func=job_leader.wrap(refresh_notices_job, name='fetch_ptu_notices'), trigger="interval", hours=6)
+# Keep the write-ahead log from growing while workers hold read snapshots
+wal_checkpointer = WalCheckpointer(DATABASE_PATH)
+# Not recorded in scheduled_job: a row write and a log line per run would
+# be most of what the job does. Its last run is at /admin/storage_status
+scheduler.add_job(func=job_leader.wrap(wal_checkpointer.checkpoint, name='wal_checkpoint', record=False),
+                  trigger="interval", minutes=5)
+
+def recent_notices(limit=10):
+    """Latest stored notices, shaped like PTUUtils.get_notices() results."""
+    with app.app_context():
+        notices = Notice.query.order_by(Notice.date_posted.desc()).limit(limit).all()
+        return [
+            {'title': notice.title, 'link': notice.link, 'date': notice.date_posted.strftime('%d/%m/%Y')}
+            for notice in notices
+        ]
+
+# Chat answers about notices use the stored ones until the first fetch from the site
+notice_cache.fallback = recent_notices
+
+def start_background_jobs():
+    """Start the scheduler and the chatbot's background threads in this process.
+
+    Not done at import, so scripts that only need the models (init_db.py,
+    migrate_db.py, ...) start no threads and make no requests. Called by
+    the __main__ entry points and by gunicorn's post_fork in each worker.
+    """
+    if not scheduler.running:
+        scheduler.start()
+    job_leader.start()
+    # Reload the chatbot knowledge base when its source files change
+    start_knowledge_base_watcher(interval=30)
+    notice_cache.start()
 
 @app.route('/delete_query', methods=['POST'])
 @login_required
@@ -447,15 +768,18 @@ def delete_query():
     
     ticket = SupportTicket.query.get(query_id)
     if ticket and ticket.user_id == current_user.id:
+        before = ticket_folders(ticket)
         if permanent:
             db.session.delete(ticket)
+            shift_folder_counts(current_user.id, before)
         else:
             ticket.deleted = True
             ticket.deleted_at = datetime.utcnow()
+            shift_folder_counts(current_user.id, before, ticket_folders(ticket))
         
         try:
             db.session.commit()
-            return jsonify({'success': True})
+            return jsonify({'success': True, 'counts': ticket_folder_counts(current_user.id)})
         except Exception as e:
             db.session.rollback()
             return jsonify({'success': False, 'error': str(e)}), 500
@@ -470,12 +794,14 @@ def archive_query():
     
     ticket = SupportTicket.query.get(query_id)
     if ticket and ticket.user_id == current_user.id:
+        before = ticket_folders(ticket)
         ticket.archived = True
         ticket.archived_at = datetime.utcnow()
+        shift_folder_counts(current_user.id, before, ticket_folders(ticket))
         
         try:
             db.session.commit()
-            return jsonify({'success': True})
+            return jsonify({'success': True, 'counts': ticket_folder_counts(current_user.id)})
         except Exception as e:
             db.session.rollback()
             return jsonify({'success': False, 'error': str(e)}), 500
@@ -490,17 +816,24 @@ def toggle_star():
     
     ticket = SupportTicket.query.get(query_id)
     if ticket and ticket.user_id == current_user.id:
+        before = ticket_folders(ticket)
         ticket.starred = not ticket.starred
+        shift_folder_counts(current_user.id, before, ticket_folders(ticket))
         
         try:
             db.session.commit()
-            return jsonify({'success': True})
+            return jsonify({'success': True, 'counts': ticket_folder_counts(current_user.id)})
         except Exception as e:
             db.session.rollback()
             return jsonify({'success': False, 'error': str(e)}), 500
     
     return jsonify({'success': False, 'error': 'Query not found'}), 404
 
+@app.route('/ticket_counts')
+@login_required
+def ticket_counts():
+    return jsonify({'success': True, 'counts': ticket_folder_counts(current_user.id)})
+
 @app.route('/refresh_queries')
 @login_required
 def refresh_queries():
@@ -528,9 +861,14 @@ def notices():
 @login_required
 def refresh_notices():
     try:
-        new_notices = fetch_ptu_notices()
-        if new_notices:
-            flash(f'Successfully added {len(new_notices)} new notices!', 'success')
+        counts = fetch_ptu_notices()
+        if counts is None:
+            flash('Could not refresh notices from the PTU website.', 'error')
+        elif counts.get('page_unchanged'):
+            flash('The PTU noticeboard has not changed since the last refresh.', 'info')
+        elif counts['inserted'] or counts['updated']:
+            flash(f"Added {counts['inserted']} new and updated {counts['updated']} notices "
+                  f"({counts['unchanged']} unchanged).", 'success')
         else:
             flash('No new notices found.', 'info')
     except Exception as e:
@@ -549,21 +887,124 @@ def current_year(format_string):
 
 ptu_utils = PTUUtils()
 
+# Turns per /get_chat_history page, and the most a client may ask for
+CHAT_HISTORY_PAGE_SIZE = 50
+MAX_CHAT_HISTORY_PAGE_SIZE = 500
+
+def chat_turn(timestamp, message, response):
+    return {
+        'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+        'user_message': message,
+        'bot_response': response
+    }
+
+def encode_history_cursor(timestamp, chat_id):
+    return f"{timestamp.isoformat()}_{chat_id}"
+
+def decode_history_cursor(cursor):
+    """Return (timestamp, id) from a cursor; raises ValueError if malformed."""
+    timestamp, chat_id = cursor.rsplit('_', 1)
+    return datetime.fromisoformat(timestamp), int(chat_id)
+
+def iter_chat_history_ndjson(user_id):
+    """Yield a user's whole history, oldest first, as NDJSON lines."""
+    result = db.session.execute(
+        select(ChatHistory.timestamp, ChatHistory.message, ChatHistory.response)
+        .where(ChatHistory.user_id == user_id)
+        .order_by(ChatHistory.timestamp, ChatHistory.id)
+        # A streaming cursor read 500 rows at a time; the ORM would otherwise buffer them all
+        .execution_options(yield_per=500)
+    )
+    for rows in result.partitions():
+        yield ''.join(json.dumps(chat_turn(*row)) + '\n' for row in rows)
+
 @app.route('/get_chat_history')
 @login_required
 def get_chat_history():
+    """Latest turns first by page: ?limit=N&before=<next_cursor>, or ?format=ndjson for all."""
     try:
-        history = ChatHistory.query.filter_by(user_id=current_user.id).order_by(ChatHistory.timestamp).all()
-        chat_list = [
-            {
-                'timestamp': chat.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-                'user_message': chat.message,
-                'bot_response': chat.response
-            } for chat in history
-        ]
-        return jsonify({'history': chat_list})
+        # Turns this worker has not written yet; other workers write theirs within a second
+        chat_history_buffer.flush()
+        if request.args.get('format') == 'ndjson':
+            return Response(stream_with_context(iter_chat_history_ndjson(current_user.id)),
+                            mimetype='application/x-ndjson')
+
+        limit = request.args.get('limit', CHAT_HISTORY_PAGE_SIZE, type=int)
+        limit = max(1, min(limit, MAX_CHAT_HISTORY_PAGE_SIZE))
+        query = db.session.query(
+            ChatHistory.id, ChatHistory.timestamp, ChatHistory.message, ChatHistory.response
+        ).filter(ChatHistory.user_id == current_user.id)
+        before = request.args.get('before')
+        if before:
+            try:
+                timestamp, chat_id = decode_history_cursor(before)
+            except ValueError:
+                return jsonify({'history': [], 'error': 'Invalid cursor'}), 400
+            # Keyset pagination: seek past the cursor instead of counting an OFFSET
+            query = query.filter(tuple_(ChatHistory.timestamp, ChatHistory.id) < (timestamp, chat_id))
+
+        # One extra row tells whether an older page exists
+        rows = query.order_by(ChatHistory.timestamp.desc(), ChatHistory.id.desc()).limit(limit + 1).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_history_cursor(rows[-1].timestamp, rows[-1].id)
+        chat_list = [chat_turn(chat.timestamp, chat.message, chat.response) for chat in reversed(rows)]
+        return jsonify({'history': chat_list, 'next_cursor': next_cursor})
     except Exception as e:
         return jsonify({'history': [], 'error': str(e)})
 
+# Results per /search scope, and the most a client may ask for
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 50
+MAX_SEARCH_OFFSET = 1000
+
+def search_page_args():
+    limit = request.args.get('limit', SEARCH_PAGE_SIZE, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    return max(1, min(limit, MAX_SEARCH_PAGE_SIZE)), max(0, min(offset, MAX_SEARCH_OFFSET))
+
+@app.route('/search')
+@login_required
+def search():
+    """Full-text search: ?q=words&scope=all|tickets|chat|notices&limit=N&offset=N.
+
+    Tickets and chat turns are the signed-in user's own; results come best
+    match first, with matching words wrapped in <mark> in HTML-escaped text.
+    """
+    query = request.args.get('q', '').strip()
+    scope = request.args.get('scope', 'all')
+    if scope not in ('all', 'tickets', 'chat', 'notices'):
+        return jsonify({'success': False, 'error': 'Invalid scope'}), 400
+    limit, offset = search_page_args()
+    try:
+        results = {}
+        if scope in ('all', 'tickets'):
+            results['tickets'] = search_tickets(db.session, query, current_user.id, limit, offset)
+        if scope in ('all', 'chat'):
+            # Turns this worker has not written yet
+            chat_history_buffer.flush()
+            results['chat'] = search_chat_history(db.session, query, current_user.id, limit, offset)
+        if scope in ('all', 'notices'):
+            results['notices'] = search_notices(db.session, query, limit, offset)
+        return jsonify({'success': True, 'query': query, 'results': results})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/admin/search')
+@admin_required
+def admin_search():
+    """Search every user's tickets, or one user's with ?user_id=N."""
+    query = request.args.get('q', '').strip()
+    user_id = request.args.get('user_id', type=int)
+    limit, offset = search_page_args()
+    try:
+        tickets = search_tickets(db.session, query, user_id, limit, offset)
+        return jsonify({'success': True, 'query': query, 'results': {'tickets': tickets}})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 if __name__ == "__main__":
+    start_background_jobs()
+    warmup()
     app.run(host="0.0.0.0", port=5000, debug=True)
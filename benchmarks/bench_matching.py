@@ -0,0 +1,191 @@
+"""Benchmark the chatbot matchers on a replayable query corpus.
+
+Run from the project root:
+
+    python -m benchmarks.bench_matching                    # compare with the stored baseline
+    python -m benchmarks.bench_matching --record-baseline  # store the current answers
+
+Each query goes through get_bot_response, find_best_match and
+get_intent_response. The report gives throughput and p50/p95/p99 latency
+per function and per corpus kind, and how many answers agree with the
+baseline. Intent answers are picked with random.choice, so the random
+module is reseeded before every call to keep answers comparable.
+
+Queries routed to the live notices page are left out of get_bot_response,
+since their latency and answers depend on the network. The response cache
+is disabled unless --cache is given, so every call does the full work.
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import random
+import sys
+from time import perf_counter
+
+from benchmarks.corpus import build_corpus
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+FUNCTIONS = ['get_bot_response', 'find_best_match', 'get_intent_response']
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def digest(answer):
+    """Short stable fingerprint of an answer, or None when there is no answer."""
+    if answer is None:
+        return None
+    if not isinstance(answer, str):
+        return answer
+    return hashlib.sha1(answer.encode('utf-8')).hexdigest()[:12]
+
+
+def run(corpus, chatbot, repeat=1, seed=0):
+    """Time every function on every query; returns (timings, answers)."""
+    kb = chatbot.get_knowledge_base()
+    calls = {
+        'get_bot_response': chatbot.get_bot_response,
+        'find_best_match': lambda query: int(chatbot.find_best_match(query)),
+        'get_intent_response': chatbot.get_intent_response,
+    }
+    # Function -> corpus kind -> latencies in seconds
+    timings = {name: {} for name in FUNCTIONS}
+    answers = []
+    for item in corpus:
+        query = item['query']
+        skip_bot = 'notices' in kb.keyword_matcher.match(query.lower())
+        row = {'query': query}
+        for name in FUNCTIONS:
+            if name == 'get_bot_response' and skip_bot:
+                row[name] = 'skipped'
+                continue
+            call = calls[name]
+            latencies = timings[name].setdefault(item['kind'], [])
+            for _ in range(repeat):
+                random.seed(seed)
+                start = perf_counter()
+                answer = call(query)
+                latencies.append(perf_counter() - start)
+            row[name] = digest(answer)
+        answers.append(row)
+    return timings, answers
+
+
+def summarize(latencies):
+    latencies = sorted(latencies)
+    total = sum(latencies)
+    return {
+        'calls': len(latencies),
+        'throughput_qps': round(len(latencies) / total, 1) if total else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000.0, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000.0, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000.0, 3),
+    }
+
+
+def compare(answers, baseline):
+    """Return {function: (agreeing, compared)} and the first few disagreements."""
+    by_query = {row['query']: row for row in baseline.get('answers', [])}
+    agreement = {name: [0, 0] for name in FUNCTIONS}
+    drift = []
+    for row in answers:
+        expected = by_query.get(row['query'])
+        if expected is None:
+            continue
+        for name in FUNCTIONS:
+            if row[name] == 'skipped' or expected.get(name) == 'skipped':
+                continue
+            agreement[name][1] += 1
+            if row[name] == expected.get(name):
+                agreement[name][0] += 1
+            elif len(drift) < 10:
+                drift.append((name, row['query']))
+    return agreement, drift
+
+
+def write_baseline(path, seed, sample, answers):
+    # One answer row per line keeps baseline changes readable in a diff
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'{{"seed": {seed}, "sample": {sample}, "answers": [\n')
+        f.write(',\n'.join(json.dumps(row, ensure_ascii=False) for row in answers))
+        f.write('\n]}\n')
+
+
+def print_report(timings, agreement=None, drift=()):
+    print(f"{'function':<22}{'kind':<9}{'calls':>7}{'qps':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name in FUNCTIONS:
+        by_kind = dict(sorted(timings[name].items()))
+        by_kind['all'] = [latency for latencies in timings[name].values() for latency in latencies]
+        for kind, latencies in by_kind.items():
+            stats = summarize(latencies)
+            print(f"{name:<22}{kind:<9}{stats['calls']:>7}{stats['throughput_qps']:>10}"
+                  f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}")
+
+    if agreement is None:
+        return
+    print()
+    for name in FUNCTIONS:
+        agreeing, compared = agreement[name]
+        rate = agreeing / compared if compared else 1.0
+        print(f"{name:<22}agreement {agreeing}/{compared} ({rate:.2%})")
+    for name, query in drift:
+        print(f"  changed {name}: {query!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the chatbot matchers.')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='baseline answers file')
+    parser.add_argument('--record-baseline', action='store_true', help='write the current answers as the baseline')
+    parser.add_argument('--seed', type=int, default=0, help='corpus and random.choice seed')
+    parser.add_argument('--sample', type=int, default=400, help='source queries to perturb')
+    parser.add_argument('--repeat', type=int, default=1, help='timed calls per query and function')
+    parser.add_argument('--cache', action='store_true', help='keep the response cache enabled')
+    parser.add_argument('--min-agreement', type=float, default=None,
+                        help='exit non-zero if any function agrees with the baseline less than this (0-1)')
+    args = parser.parse_args(argv)
+
+    # Loading the knowledge base prints progress; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        import chatbot.chatbot as chatbot
+        chatbot.get_knowledge_base()
+    if not args.cache:
+        chatbot.response_cache.max_entries = 0
+
+    corpus = build_corpus(seed=args.seed, sample=args.sample)
+    print(f"Corpus: {len(corpus)} queries (seed {args.seed})")
+    timings, answers = run(corpus, chatbot, repeat=args.repeat, seed=args.seed)
+
+    if args.record_baseline:
+        write_baseline(args.baseline, args.seed, args.sample, answers)
+        print_report(timings)
+        print(f"\nRecorded baseline for {len(answers)} queries in {args.baseline}")
+        return 0
+
+    agreement = None
+    drift = ()
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if (baseline.get('seed'), baseline.get('sample')) != (args.seed, args.sample):
+            print("Warning: baseline was recorded with a different seed or sample size")
+        agreement, drift = compare(answers, baseline)
+    else:
+        print(f"No baseline at {args.baseline}; run with --record-baseline to create one")
+    print_report(timings, agreement, drift)
+
+    if args.min_agreement is not None and agreement:
+        for agreeing, compared in agreement.values():
+            if compared and agreeing / compared < args.min_agreement:
+                return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""Report the memory one chatbot worker needs to serve.
+
+Run from the project root:
+
+    python -m benchmarks.bench_memory                # as a worker starts: artifact if present
+    python -m benchmarks.bench_memory --no-artifact  # refit from the source files
+
+Prints the resident set size after warmup(), the bytes held by one
+knowledge base snapshot (traced with tracemalloc while a second snapshot
+is loaded), and whether pandas ended up imported. Every gunicorn worker
+pays the resident size, so multiply by the worker count.
+"""
+import argparse
+import contextlib
+import io
+import sys
+import tempfile
+import tracemalloc
+
+
+def rss_kb():
+    """Current resident set size in kB (Linux)."""
+    with open('/proc/self/status', 'r') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Report chatbot worker memory.')
+    parser.add_argument('--no-artifact', action='store_true', help='ignore the precompiled artifact')
+    args = parser.parse_args(argv)
+
+    rss_start = rss_kb()
+    with contextlib.redirect_stdout(io.StringIO()):
+        import chatbot.chatbot as chatbot
+        import chatbot.kb_artifact as kb_artifact
+        if args.no_artifact:
+            kb_artifact.ARTIFACT_ROOT = tempfile.mkdtemp()
+        chatbot.warmup()
+    rss_warm = rss_kb()
+
+    # Size of one snapshot: trace a second load while the first is still referenced
+    first = chatbot.get_knowledge_base()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    with contextlib.redirect_stdout(io.StringIO()):
+        chatbot.load_knowledge_base(force=True)
+    second = chatbot.get_knowledge_base()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"Knowledge base source:      {'sources' if args.no_artifact else 'artifact if present'}")
+    print(f"Questions:                  {len(second.questions)}")
+    print(f"RSS at start:               {rss_start / 1024:.1f} MiB")
+    print(f"RSS after warmup:           {rss_warm / 1024:.1f} MiB")
+    print(f"Snapshot size (traced):     {(after - before) / 1024:.1f} KiB")
+    print(f"Snapshot load peak:         {(peak - before) / 1024:.1f} KiB")
+    print(f"pandas imported:            {'pandas' in sys.modules}")
+    del first
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
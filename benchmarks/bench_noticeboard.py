@@ -0,0 +1,135 @@
+"""Benchmark parsing of the noticeboard table against saved pages.
+
+Run from the project root:
+
+    python -m benchmarks.bench_noticeboard
+
+Every benchmarks/fixtures/*.html page is parsed the old way (a full
+html.parser tree of the whole page) and with noticeboard.iter_notice_rows,
+using its html.parser strainer and, when installed, lxml. The rows must
+match the old parse exactly; the report gives the median time per page.
+
+Pages saved from the university site go in benchmarks/fixtures/live/
+and are reported as "live"; the generated pages directly in
+benchmarks/fixtures/ are laid out like them (a large menu, widgets and
+scripts around one notice table) and stay as the scale test. To save
+the current noticeboard as a live fixture:
+
+    python -m benchmarks.bench_noticeboard --save
+"""
+import argparse
+import glob
+import importlib.util
+import os
+import statistics
+import sys
+from datetime import date
+from time import perf_counter
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup
+
+from noticeboard import FETCH_TIMEOUT, NOTICEBOARD_URL, iter_notice_rows, make_session
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+LIVE_FIXTURES_DIR = os.path.join(FIXTURES_DIR, 'live')
+
+
+def save_live_page(url):
+    """Download a noticeboard page into the live fixtures; returns its path."""
+    response = make_session().get(url, timeout=FETCH_TIMEOUT)
+    response.raise_for_status()
+    name = urlparse(url).path.strip('/').replace('/', '-') or 'index'
+    path = os.path.join(LIVE_FIXTURES_DIR, f'{name}-{date.today():%Y-%m-%d}.html')
+    os.makedirs(LIVE_FIXTURES_DIR, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(response.text)
+    return path
+
+
+def full_tree_rows(html):
+    """The original scraper: parse the whole page, then read the first table."""
+    soup = BeautifulSoup(html, 'html.parser')
+    notice_table = soup.find('table')
+    if not notice_table:
+        return []
+    rows = []
+    for row in notice_table.find_all('tr')[1:]:
+        cols = row.find_all('td')
+        if len(cols) >= 3:
+            rows.append((
+                cols[0].text.strip(),
+                cols[1].text.strip(),
+                cols[2].find('a')['href'] if cols[2].find('a') else None,
+            ))
+    return rows
+
+
+def median_ms(func, html, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func(html)
+        timings.append(perf_counter() - start)
+    return statistics.median(timings) * 1000.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark noticeboard table parsing.')
+    parser.add_argument('--repeat', type=int, default=5, help='parses per page and method')
+    parser.add_argument('--save', nargs='?', const=NOTICEBOARD_URL, metavar='URL',
+                        help=f'save a page (default {NOTICEBOARD_URL}) to benchmarks/fixtures/live/ first')
+    parser.add_argument('fixtures', nargs='*',
+                        help='HTML files (default: benchmarks/fixtures/live/*.html and benchmarks/fixtures/*.html)')
+    args = parser.parse_args(argv)
+
+    if args.save:
+        try:
+            print(f"Saved {save_live_page(args.save)}")
+        except Exception as e:
+            print(f"Error saving {args.save}: {e}")
+            return 1
+
+    methods = [
+        ('full tree, html.parser', full_tree_rows),
+        ('strainer, html.parser', lambda html: list(iter_notice_rows(html, 'html.parser'))),
+    ]
+    if importlib.util.find_spec('lxml'):
+        methods.append(('lxml', lambda html: list(iter_notice_rows(html, 'lxml'))))
+    else:
+        print("lxml is not installed; skipping the lxml parser")
+
+    live = sorted(glob.glob(os.path.join(LIVE_FIXTURES_DIR, '*.html')))
+    if args.fixtures:
+        paths = args.fixtures
+    else:
+        paths = live + sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html')))
+        if not live:
+            print("No live pages in benchmarks/fixtures/live; run with --save to measure the real site")
+    failed = False
+    print(f"{'page':<36}{'kind':<10}{'KiB':>7}{'rows':>6}  {'method':<24}{'median ms':>10}{'speedup':>9}")
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            html = f.read()
+        kind = 'live' if os.path.dirname(os.path.abspath(path)) == LIVE_FIXTURES_DIR else 'synthetic'
+        expected = full_tree_rows(html)
+        if not expected:
+            # A block page or an error page would make every parser look fast
+            print(f"{os.path.basename(path)}: no notice rows found")
+            failed = True
+            continue
+        baseline_ms = None
+        for name, method in methods:
+            if method(html) != expected:
+                print(f"{os.path.basename(path)}: {name} returned different rows")
+                failed = True
+                continue
+            ms = median_ms(method, html, args.repeat)
+            baseline_ms = baseline_ms or ms
+            print(f"{os.path.basename(path):<36}{kind:<10}{len(html) / 1024:>7.0f}{len(expected):>6}  "
+                  f"{name:<24}{ms:>10.1f}{baseline_ms / ms:>8.1f}x")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""Benchmark full-text search over a large chat history.
+
+Run from the project root:
+
+    python -m benchmarks.bench_search
+    python -m benchmarks.bench_search --rows 2000000 --users 2000
+
+Seeds a scratch database with a chat_history table like the portal's
+(words drawn from a skewed vocabulary, so some are in most rows and some
+in a few), builds the FTS5 index from it with rebuild_search_index() as
+migrate_db.py does for existing rows, and then times one user's searches:
+through search_chat_history(), which limits the FTS query to the user,
+and, for comparison, a LIKE '%word%' filter on the user's rows and a LIKE
+over the whole table. It also times 10000 inserts without indexing,
+indexed by index_new_rows() as the chat history writer does, and indexed
+by a per-row trigger as tickets and notices are (see BATCH_INDEXED).
+
+Ranking reads every row a word is in to weigh it, so a word found in
+nearly every row (w1 here) is the slow case; search_index.STOPWORDS keeps
+the real-world ones out of queries.
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from search_index import fts_table, index_new_rows, install_search_index, rebuild_search_index, search_chat_history
+from sqlite_profile import configure_connection
+
+VOCABULARY = 5000
+
+SCHEMA = """
+CREATE TABLE chat_history (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    message TEXT NOT NULL,
+    response TEXT NOT NULL,
+    timestamp DATETIME
+);
+CREATE INDEX ix_chat_history_user_timestamp ON chat_history (user_id, timestamp);
+CREATE TABLE support_ticket (
+    id INTEGER PRIMARY KEY, user_id INTEGER, subject TEXT, message TEXT, status TEXT,
+    created_at DATETIME, updated_at DATETIME, deleted BOOLEAN, deleted_at DATETIME,
+    archived BOOLEAN, archived_at DATETIME, starred BOOLEAN
+);
+CREATE TABLE notice (
+    id INTEGER PRIMARY KEY, title TEXT, title_key TEXT, date_posted DATETIME, link TEXT, created_at DATETIME
+);
+"""
+
+
+def word(rank):
+    return f'w{rank}'
+
+
+def sentence(rng, length):
+    # Zipf-like: word k turns up about 1/k as often as word 1
+    return ' '.join(word(int(VOCABULARY ** rng.random())) for _ in range(length))
+
+
+def rows(rng, count, users, first_id=1):
+    for i in range(first_id, first_id + count):
+        yield (i, rng.randrange(users), sentence(rng, 8), sentence(rng, 30), '2024-01-01 00:00:00')
+
+
+def seed(path, args):
+    conn = sqlite3.connect(path)
+    configure_connection(conn)
+    conn.executescript(SCHEMA)
+    rng = random.Random(1)
+    start = time.perf_counter()
+    conn.executemany('INSERT INTO chat_history VALUES (?, ?, ?, ?, ?)', rows(rng, args.rows, args.users))
+    conn.commit()
+    print(f"seeded {args.rows} chat rows for {args.users} users in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    install_search_index(conn)
+    rebuild_search_index(conn, ['chat_history'])
+    print(f"built the search index from them in {time.perf_counter() - start:.1f}s")
+    return conn
+
+
+def timed(func, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return result, latencies
+
+
+def report(label, latencies, hits):
+    p95 = statistics.quantiles(latencies, n=20)[18] if len(latencies) >= 2 else latencies[0]
+    print(f"{label:<42}{statistics.median(latencies):>10.2f}{p95:>10.2f}{hits:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark FTS5 search over chat history.')
+    parser.add_argument('--rows', type=int, default=1000000, help='chat rows seeded')
+    parser.add_argument('--users', type=int, default=1000, help='users the rows belong to')
+    parser.add_argument('--repeat', type=int, default=20, help='runs of each search')
+    args = parser.parse_args(argv)
+
+    scratch = tempfile.mkdtemp()
+    path = os.path.join(scratch, 'bench.db')
+    try:
+        conn = seed(path, args)
+        engine = create_engine(f'sqlite:///{path}')
+        session = Session(engine)
+        user_id = 1
+
+        print(f"{'search (one user)':<42}{'median ms':>10}{'p95 ms':>10}{'hits':>8}")
+        for label, query in (('word in ~95% of rows', word(1)), ('word in ~20% of rows', word(20)),
+                             ('word in ~2% of rows', word(200)), ('rare word', word(3000)),
+                             ('two words', f'{word(20)} {word(200)}')):
+            results, latencies = timed(lambda: search_chat_history(session, query, user_id), args.repeat)
+            report(f'fts: {label}', latencies, len(results))
+
+        pattern = f'%{word(3000)} %'
+        hits, latencies = timed(lambda: conn.execute(
+            'SELECT COUNT(*) FROM chat_history WHERE user_id = ? AND (message LIKE ? OR response LIKE ?)',
+            (user_id, pattern, pattern)).fetchone()[0], args.repeat)
+        report("like: rare word, user's rows", latencies, hits)
+        hits, latencies = timed(lambda: conn.execute(
+            'SELECT COUNT(*) FROM chat_history WHERE message LIKE ? OR response LIKE ?',
+            (pattern, pattern)).fetchone()[0], max(1, args.repeat // 10))
+        report('like: rare word, whole table', latencies, hits)
+        session.close()
+
+        rng = random.Random(2)
+        timings = {}
+        first_id = args.rows + 1
+        for label in ('no index', 'index_new_rows()', 'per-row trigger'):
+            batch = list(rows(rng, 10000, args.users, first_id=first_id))
+            if label == 'per-row trigger':
+                fts = fts_table('chat_history')
+                conn.execute(
+                    f"CREATE TRIGGER {fts}_insert AFTER INSERT ON chat_history BEGIN "
+                    f"INSERT INTO {fts} (rowid, user_id, message, response) "
+                    f"VALUES (new.id, new.user_id, new.message, new.response); END"
+                )
+            start = time.perf_counter()
+            conn.executemany('INSERT INTO chat_history VALUES (?, ?, ?, ?, ?)', batch)
+            if label == 'index_new_rows()':
+                index_new_rows(conn, 'chat_history', first_id)
+            conn.commit()
+            timings[label] = time.perf_counter() - start
+            first_id += len(batch)
+        # The unindexed rows are left out of the index; only the timings matter here
+        print('10000 inserts: ' + ', '.join(f"{label} {seconds * 1000:.0f}ms" for label, seconds in timings.items()))
+        conn.close()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""Benchmark SQLite under parallel readers and writers, with and without the profile.
+
+Run from the project root:
+
+    python -m benchmarks.bench_sqlite
+    python -m benchmarks.bench_sqlite --readers 8 --writers 4 --seconds 10
+
+Each run seeds a scratch database with a chat_history table like the
+portal's, then starts reader processes (a user's latest 50 turns, like
+/get_chat_history) and writer processes (one committed insert per chat
+turn) for a fixed time. "default" connects the way SQLAlchemy does out of
+the box (rollback journal, full sync); "profile" applies
+sqlite_profile.PRAGMAS. The report gives operations per second, p99
+latency and how many operations failed with "database is locked".
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from sqlite_profile import configure_connection
+
+USERS = 200
+
+
+def connect(path, profile):
+    conn = sqlite3.connect(path)
+    if profile == 'profile':
+        configure_connection(conn)
+    return conn
+
+
+def seed(path, profile, rows):
+    conn = connect(path, profile)
+    conn.execute("""
+        CREATE TABLE chat_history (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            message TEXT NOT NULL,
+            response TEXT NOT NULL,
+            timestamp DATETIME
+        )
+    """)
+    conn.execute('CREATE INDEX ix_chat_history_user_timestamp ON chat_history (user_id, timestamp)')
+    conn.executemany(
+        "INSERT INTO chat_history (user_id, message, response, timestamp) VALUES (?, ?, ?, datetime('now'))",
+        [(i % USERS, f'question {i}', 'answer ' * 40) for i in range(rows)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def worker(path, profile, role, start_at, seconds, results):
+    conn = connect(path, profile)
+    rng = random.Random(os.getpid())
+    latencies = []
+    locked = 0
+    while time.time() < start_at:
+        time.sleep(0.001)
+    end = start_at + seconds
+    while time.time() < end:
+        user_id = rng.randrange(USERS)
+        start = time.perf_counter()
+        try:
+            if role == 'read':
+                conn.execute(
+                    'SELECT id, timestamp, message, response FROM chat_history WHERE user_id = ? '
+                    'ORDER BY timestamp DESC, id DESC LIMIT 50', (user_id,)
+                ).fetchall()
+            else:
+                conn.execute(
+                    "INSERT INTO chat_history (user_id, message, response, timestamp) "
+                    "VALUES (?, ?, ?, datetime('now'))", (user_id, 'question', 'answer ' * 40)
+                )
+                conn.commit()
+        except sqlite3.OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            conn.rollback()
+            locked += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+    results.put((role, latencies, locked))
+
+
+def run(profile, args):
+    scratch = tempfile.mkdtemp()
+    path = os.path.join(scratch, 'bench.db')
+    try:
+        seed(path, profile, args.rows)
+        results = multiprocessing.Queue()
+        start_at = time.time() + 1.0
+        roles = ['read'] * args.readers + ['write'] * args.writers
+        processes = [
+            multiprocessing.Process(target=worker, args=(path, profile, role, start_at, args.seconds, results))
+            for role in roles
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    for role in ('read', 'write'):
+        latencies = [latency for r, values, _ in collected if r == role for latency in values]
+        locked = sum(count for r, _, count in collected if r == role)
+        p99 = statistics.quantiles(latencies, n=100)[98] * 1000 if len(latencies) >= 2 else float('nan')
+        print(f"{profile:<9}{role:<7}{len(latencies) / args.seconds:>10.0f}{p99:>10.2f}{locked:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark SQLite under parallel load.')
+    parser.add_argument('--readers', type=int, default=4, help='reader processes')
+    parser.add_argument('--writers', type=int, default=4, help='writer processes')
+    parser.add_argument('--seconds', type=float, default=5, help='duration of each run')
+    parser.add_argument('--rows', type=int, default=20000, help='rows seeded before the run')
+    args = parser.parse_args(argv)
+
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds:g}s per profile")
+    print(f"{'profile':<9}{'op':<7}{'ops/s':>10}{'p99 ms':>10}{'locked':>8}")
+    for profile in ('default', 'profile'):
+        run(profile, args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
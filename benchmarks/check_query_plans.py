@@ -0,0 +1,25 @@
+"""Check that the portal's hot queries are answered from indexes.
+
+Run from the project root:
+
+    python -m benchmarks.check_query_plans
+
+Runs tests/test_query_plans.py, which requests the pages that list
+tickets, chat history and notices against a scratch database and fails if
+a query plan reads a whole table or sorts rows in a temporary B-tree.
+Extra arguments are passed to pytest, e.g. -v.
+"""
+import os
+import sys
+
+import pytest
+
+TESTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests', 'test_query_plans.py')
+
+
+def main(argv=None):
+    return pytest.main([TESTS, '-q'] + list(sys.argv[1:] if argv is None else argv))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Replayable query corpus for the chatbot matching benchmarks.
+
+The corpus is every CSV question and intents.json pattern, plus perturbed
+variants of a seeded sample of them: typos, casing changes and extra
+words around the question. The same seed always yields the same corpus.
+"""
+import csv
+import json
+import random
+
+from chatbot.knowledge_base import CSV_PATH, INTENTS_PATH
+
+FILLER_PREFIXES = ['please tell me', 'can you tell me', 'hey', 'i want to know']
+FILLER_SUFFIXES = ['please', 'thanks', 'asap', '?']
+# Neighbouring keys on a QWERTY keyboard, for substitution typos
+KEYBOARD_NEIGHBOURS = {
+    'a': 'qsz', 'b': 'vgn', 'c': 'xvd', 'd': 'sfe', 'e': 'wrd', 'f': 'dgr', 'g': 'fht',
+    'h': 'gjy', 'i': 'uok', 'j': 'hku', 'k': 'jli', 'l': 'kop', 'm': 'nj', 'n': 'bmh',
+    'o': 'ipl', 'p': 'ol', 'q': 'wa', 'r': 'etf', 's': 'adw', 't': 'ryg', 'u': 'yij',
+    'v': 'cbf', 'w': 'qes', 'x': 'zcs', 'y': 'tuh', 'z': 'xa',
+}
+
+
+def load_source_queries(csv_path=CSV_PATH, intents_path=INTENTS_PATH):
+    """Return [(source, query)] for every CSV question and intent pattern."""
+    queries = []
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            question = (row.get('User Query (Pattern)') or '').strip()
+            if question:
+                queries.append(('csv', question))
+    with open(intents_path, 'r', encoding='utf-8') as f:
+        for intent in json.load(f).get('intents', []):
+            for pattern in intent.get('patterns', []):
+                if pattern.strip():
+                    queries.append(('intent', pattern.strip()))
+    return queries
+
+
+def add_typo(text, rng):
+    """Apply one swap, deletion, duplication or neighbour-key substitution to a word."""
+    words = text.split()
+    candidates = [i for i, word in enumerate(words) if len(word) > 3 and word.isalpha()]
+    if not candidates:
+        return text
+    i = rng.choice(candidates)
+    word = words[i]
+    pos = rng.randrange(1, len(word) - 1)
+    kind = rng.choice(['swap', 'delete', 'duplicate', 'substitute'])
+    if kind == 'swap':
+        word = word[:pos] + word[pos + 1] + word[pos] + word[pos + 2:]
+    elif kind == 'delete':
+        word = word[:pos] + word[pos + 1:]
+    elif kind == 'duplicate':
+        word = word[:pos] + word[pos] + word[pos:]
+    else:
+        neighbours = KEYBOARD_NEIGHBOURS.get(word[pos].lower(), word[pos])
+        word = word[:pos] + rng.choice(neighbours) + word[pos + 1:]
+    words[i] = word
+    return ' '.join(words)
+
+
+def change_case(text, rng):
+    kind = rng.choice(['upper', 'title', 'random'])
+    if kind == 'upper':
+        return text.upper()
+    if kind == 'title':
+        return text.title()
+    return ''.join(char.upper() if rng.random() < 0.5 else char.lower() for char in text)
+
+
+def add_extra_words(text, rng):
+    if rng.random() < 0.5:
+        return f"{rng.choice(FILLER_PREFIXES)} {text}"
+    return f"{text} {rng.choice(FILLER_SUFFIXES)}"
+
+
+PERTURBATIONS = [('typo', add_typo), ('case', change_case), ('extra', add_extra_words)]
+
+
+def build_corpus(seed=0, sample=400, csv_path=CSV_PATH, intents_path=INTENTS_PATH):
+    """Return [{'kind': ..., 'query': ...}] with the originals first, then the variants."""
+    rng = random.Random(seed)
+    sources = load_source_queries(csv_path, intents_path)
+    corpus = [{'kind': source, 'query': query} for source, query in sources]
+
+    sampled = rng.sample(sources, min(sample, len(sources)))
+    for _, query in sampled:
+        for kind, perturb in PERTURBATIONS:
+            corpus.append({'kind': kind, 'query': perturb(query, rng)})
+    return corpus
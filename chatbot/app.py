@@ -8,7 +8,6 @@ import os
 import re
 import json
 from datetime import datetime, timedelta
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import requests
@@ -19,6 +18,8 @@ import io
 import logging
 from werkzeug.utils import secure_filename
 import ptu_utils
+from matchers import KeywordMatcher
+from outbox import Outbox
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -42,6 +43,7 @@ EMAIL_PORT = 587
 EMAIL_USER = 'your@gmail.com'
 EMAIL_PASS = 'your password'
 ADMIN_EMAILS = ['admin1@gmail.com', 'admin2@gmail.com']
+outbox = Outbox(EMAIL_HOST, EMAIL_PORT, EMAIL_USER, EMAIL_PASS)
 
 # Initialize chatbot data
 df = None
@@ -49,6 +51,56 @@ responses = {}
 vectorizer = None
 question_vectors = None
 
+# Keyword routes, checked in this priority order by get_bot_response
+HOSTEL_KEYWORDS = ["hostel", "hostels", "hostel application", "hostel facility", "hostel accommodation",
+                   "hostel room", "hostel fees", "hostel rules", "hostel registration", "hostel form"]
+COURSES = ["btech", "mtech", "mba"]
+DOCUMENT_KEYWORDS = [
+    ("fee_structure", "fee structure", ["fee", "fees"]),
+    ("timetable", "timetable", ["timetable", "time table"]),
+    ("syllabus", "syllabus", ["syllabus"]),
+]
+
+HOSTEL_RESPONSE = """IKGPTU provides hostel facilities for students. Here's how to apply for hostel:
+
+1. Hostel Application Process:
+   - Visit the university website and download the hostel application form
+   - Fill out the form with your details
+   - Submit the form along with required documents to the hostel office
+   - Pay the hostel fees as per the fee structure
+
+2. Required Documents:
+   - Admission letter
+   - ID proof
+   - Passport size photographs
+   - Medical fitness certificate
+   - Parent/Guardian consent form
+
+3. Hostel Facilities:
+   - Separate hostels for boys and girls
+   - 24/7 security
+   - Mess facility
+   - Common room
+   - Wi-Fi connectivity
+   - Laundry service
+   - Medical facilities
+
+For more details, please contact the hostel office at:
+Email: hostel@ikgptu.edu.in
+Phone: [University Contact Number]
+
+Note: Hostel accommodation is subject to availability and university rules."""
+
+def build_keyword_matcher(responses):
+    rules = [("hostel", keyword, keyword) for keyword in HOSTEL_KEYWORDS]
+    rules.extend(("responses", pattern, pattern.lower()) for pattern in responses)
+    for doc_type, _, keywords in DOCUMENT_KEYWORDS:
+        rules.extend((doc_type, keyword, keyword) for keyword in keywords)
+    rules.extend(("course", course, course) for course in COURSES)
+    return KeywordMatcher(rules)
+
+keyword_matcher = build_keyword_matcher({})
+
 # Load chatbot data
 try:
     # Load CSV file
@@ -77,6 +129,7 @@ try:
             print("Successfully loaded responses JSON")
     else:
         print(f"Warning: JSON file not found at {json_path}")
+    keyword_matcher = build_keyword_matcher(responses)
         
 except Exception as e:
     print(f"Error loading data: {str(e)}")
@@ -113,63 +166,26 @@ def get_bot_response(user_message):
             
         message_lower = user_message.lower().strip()
         
+        # Find every routing keyword in one pass over the message
+        matches = keyword_matcher.match(message_lower)
+        
         # First check JSON responses
         if responses:
             # Check for hostel related keywords
-            hostel_keywords = ["hostel", "hostels", "hostel application", "hostel facility", "hostel accommodation", 
-                            "hostel room", "hostel fees", "hostel rules", "hostel registration", "hostel form"]
-            
-            if any(keyword in message_lower for keyword in hostel_keywords):
-                return """IKGPTU provides hostel facilities for students. Here's how to apply for hostel:
-
-1. Hostel Application Process:
-   - Visit the university website and download the hostel application form
-   - Fill out the form with your details
-   - Submit the form along with required documents to the hostel office
-   - Pay the hostel fees as per the fee structure
-
-2. Required Documents:
-   - Admission letter
-   - ID proof
-   - Passport size photographs
-   - Medical fitness certificate
-   - Parent/Guardian consent form
-
-3. Hostel Facilities:
-   - Separate hostels for boys and girls
-   - 24/7 security
-   - Mess facility
-   - Common room
-   - Wi-Fi connectivity
-   - Laundry service
-   - Medical facilities
-
-For more details, please contact the hostel office at:
-Email: hostel@ikgptu.edu.in
-Phone: [University Contact Number]
-
-Note: Hostel accommodation is subject to availability and university rules."""
+            if "hostel" in matches:
+                return HOSTEL_RESPONSE
         
             # Check other patterns in JSON
-            for pattern, response in responses.items():
-                if pattern.lower() in message_lower:
-                    return response
+            if "responses" in matches:
+                return responses[matches["responses"][0]]
         
         # Then check document requests
-        if any(word in message_lower for word in ["fee", "fees"]):
-            for course in ["btech", "mtech", "mba"]:
-                if course in message_lower:
-                    return f"You can find the {course.upper()} fee structure here: /download/fee_structure/{course}"
-        
-        if any(word in message_lower for word in ["timetable", "time table"]):
-            for course in ["btech", "mtech", "mba"]:
-                if course in message_lower:
-                    return f"You can find the {course.upper()} timetable here: /download/timetable/{course}"
-        
-        if "syllabus" in message_lower:
-            for course in ["btech", "mtech", "mba"]:
-                if course in message_lower:
-                    return f"You can find the {course.upper()} syllabus here: /download/syllabus/{course}"
+        courses = matches.get("course")
+        if courses:
+            course = courses[0]
+            for doc_type, label, _ in DOCUMENT_KEYWORDS:
+                if doc_type in matches:
+                    return f"You can find the {course.upper()} {label} here: /download/{doc_type}/{course}"
         
         # Only if no JSON match found, try CSV data
         best_response, similarity = find_best_match(message_lower)
@@ -293,38 +309,15 @@ def live_support():
             
             msg.attach(MIMEText(body, 'plain'))
             
-            # Log SMTP connection attempt
-            logger.info("Attempting to connect to SMTP server...")
-            
-            # Send email
-            server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT, timeout=10)
-            server.ehlo()
-            server.starttls()
-            server.ehlo()
-            logger.info("SMTP TLS started, attempting login...")
-            server.login(EMAIL_USER, EMAIL_PASS)
-            logger.info("SMTP login successful, sending email...")
-            server.send_message(msg)
-            logger.info(f"Email sent successfully to {', '.join(ADMIN_EMAILS)}")
-            server.quit()
+            # Queue the email; the outbox thread sends it over a shared SMTP connection
+            message_id = outbox.enqueue(msg)
+            logger.info(f"Support email {message_id} queued for {', '.join(ADMIN_EMAILS)}")
             
             return jsonify({
                 'success': True,
                 'message': 'आपका संदेश सफलतापूर्वक भेज दिया गया है! हम जल्द ही आपसे संपर्क करेंगे।'
             })
             
-        except smtplib.SMTPAuthenticationError as e:
-            logger.error(f"SMTP Authentication failed: {str(e)}")
-            return jsonify({
-                'success': False,
-                'message': 'Email authentication failed. Please check your email credentials.'
-            })
-        except smtplib.SMTPException as e:
-            logger.error(f"SMTP Error: {str(e)}")
-            return jsonify({
-                'success': False,
-                'message': 'Error sending email. Please try again later.'
-            })
         except Exception as e:
             logger.error(f"Unexpected error: {str(e)}")
             return jsonify({
@@ -379,6 +372,8 @@ def download_document(doc_type, course):
         return "Error downloading file", 500
 
 if __name__ == '__main__':
+    # Send anything left in the outbox by a previous run
+    outbox.start()
     print("\nStarting chatbot server...")
     print("Access the chatbot at http://localhost:5000")
     app.run(debug=True)
@@ -1,32 +1,23 @@
 from flask import Flask, render_template, request, jsonify, send_file, session
-import pandas as pd
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import gc
 import random
 import os
 import re
-import json
+import threading
 from datetime import datetime
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-import nltk
 from utils import PTUUtils
-import smtplib
+from chatbot.matchers import KeywordMatcher, QuestionIndex
+from chatbot.notice_cache import NoticeCache
+from chatbot.outbox import Outbox
+from chatbot.response_cache import ResponseCache
+from chatbot.tracing import NULL_TRACE, PipelineMetrics, Trace, logger
+from chatbot.knowledge_base import (
+    CSV_PATH, RESPONSES_PATH, INTENTS_PATH, SOURCE_PATHS,
+    KnowledgeBase, KnowledgeBaseWatcher, source_signature, content_hash,
+)
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
-
 app = Flask(__name__)
 app.secret_key = 'your_secret_key_here'  # Required for session
 ptu_utils = PTUUtils()
@@ -34,11 +25,58 @@ ptu_utils = PTUUtils()
 # Store chat history in memory
 chat_histories = {}
 
-# Initialize empty DataFrame and responses
-df = pd.DataFrame()
-responses = {}
-vectorizer = None
-question_vectors = None
+# Keyword routes, checked in this priority order by get_bot_response
+COURSES = ["btech", "mtech", "mba"]
+DOCUMENT_KEYWORDS = [
+    ("fee_structure", ["fee", "fees"]),
+    ("timetable", ["timetable", "time table"]),
+    ("syllabus", ["syllabus"]),
+]
+NOTICE_KEYWORDS = ["notice", "notices", "notification"]
+
+def build_keyword_matcher(responses):
+    rules = []
+    for doc_type, keywords in DOCUMENT_KEYWORDS:
+        rules.extend((doc_type, keyword, keyword) for keyword in keywords)
+    rules.extend(("course", course, course) for course in COURSES)
+    rules.extend(("notices", keyword, keyword) for keyword in NOTICE_KEYWORDS)
+    rules.extend(("responses", pattern, pattern.lower()) for pattern in responses)
+    return KeywordMatcher(rules)
+
+# Touching this file makes every worker's watcher reload, even if the
+# sources are unchanged
+RELOAD_TRIGGER_PATH = 'data/.reload_knowledge_base'
+
+# The current snapshot, built on first use or by warmup(). Requests read
+# this reference once and use that snapshot throughout; reloads build a
+# new one and swap the reference.
+knowledge_base = None
+_reload_lock = threading.Lock()
+_initial_load_lock = threading.Lock()
+_knowledge_base_watcher = None
+# Interval of the watcher this process started, so a forked worker can restart it
+_watcher_interval = None
+_ready = threading.Event()
+
+# Replies keyed on reply_cache_key() of the message. Notices come
+# from the live site so they expire quickly; errors are never cached.
+response_cache = ResponseCache(
+    max_entries=2048,
+    ttl=600,
+    route_ttls={"notices": 60, "error": None, "empty": None},
+)
+
+# Notices for chat answers come from memory; a background thread refetches
+# them every NOTICE_TTL seconds, with a timeout on each request to the site
+NOTICE_TTL = 300
+NOTICE_FETCH_TIMEOUT = 5
+notice_cache = NoticeCache(
+    lambda: ptu_utils.fetch_notices(timeout=NOTICE_FETCH_TIMEOUT),
+    ttl=NOTICE_TTL,
+)
+
+# Per-stage and per-route latency histograms, see export_metrics()
+metrics = PipelineMetrics()
 
 # Email configuration
 SMTP_SERVER = "smtp.gmail.com"
@@ -46,59 +84,168 @@ SMTP_PORT = 587
 EMAIL_USERNAME = "your-email@gmail.com"  # Replace with your email
 EMAIL_PASSWORD = "your-app-password"     # Replace with your app password
 SUPPORT_EMAIL = "support@ptu.ac.in"      # Replace with support email
+outbox = Outbox(SMTP_SERVER, SMTP_PORT, EMAIL_USERNAME, EMAIL_PASSWORD)
 
-# Try to load data files
-try:
-    # Load CSV file
-    csv_path = 'Structured_Chatbot_Data    chatbot csv.csv'
-    if os.path.exists(csv_path):
-        df = pd.read_csv(csv_path, encoding='utf-8')
-        # Clean the data
-        df['User Query (Pattern)'] = df['User Query (Pattern)'].fillna('')
-        df['Bot Response'] = df['Bot Response'].fillna('')
-        df['User Query (Pattern)'] = df['User Query (Pattern)'].astype(str)
-        df['Bot Response'] = df['Bot Response'].astype(str)
-        
-        # Initialize TF-IDF vectorizer
-        vectorizer = TfidfVectorizer()
-        question_vectors = vectorizer.fit_transform(df['User Query (Pattern)'])
-        
-        print(f"Successfully loaded CSV file with {len(df)} rows")
-        print("Sample data from CSV:")
-        print(df.head())
-    else:
-        print(f"Error: CSV file not found at {csv_path}")
-        print(f"Current working directory: {os.getcwd()}")
-        print(f"Directory contents: {os.listdir('.')}")
-    
-    # Load responses JSON if exists
-    json_path = 'data/responses.json'
-    if os.path.exists(json_path):
-        with open(json_path, 'r', encoding='utf-8') as f:
-            responses = json.load(f)
-            print("Successfully loaded responses JSON")
-            print(f"Number of responses: {len(responses)}")
-    else:
-        print(f"Error: JSON file not found at {json_path}")
-        print(f"Directory contents of data/: {os.listdir('data') if os.path.exists('data') else 'data directory not found'}")
-
-    # Load intents JSON if exists
-    intents_path = 'data/intents.json'
-    intents = []
-    if os.path.exists(intents_path):
-        with open(intents_path, 'r', encoding='utf-8') as f:
-            intents_data = json.load(f)
-            intents = intents_data.get('intents', [])
-            print("Successfully loaded intents JSON")
-            print(f"Number of intents: {len(intents)}")
-    else:
-        print(f"Error: Intents JSON file not found at {intents_path}")
-
-except Exception as e:
-    print(f"Error loading data files: {str(e)}")
-    print(f"Exception type: {type(e)}")
-    import traceback
-    print(f"Traceback: {traceback.format_exc()}")
+def load_knowledge_base(force=True):
+    """Rebuild the knowledge base and swap it in atomically.
+
+    With force=False the rebuild is skipped unless the source files'
+    content hash changed or the reload trigger file was touched. Returns
+    True when a new snapshot was published. If loading fails the current
+    snapshot stays in place.
+    """
+    global knowledge_base
+    # Deferred so importing this module does not pull in the ML stack
+    from chatbot.kb_artifact import ARTIFACT_ROOT, ArtifactError, load_artifact
+
+    with _reload_lock:
+        current = knowledge_base
+        if current is None and not force:
+            # Nothing loaded yet; the first request or warmup() will load it
+            return False
+        next_version = current.version + 1 if current is not None else 1
+        signature = source_signature(SOURCE_PATHS + [RELOAD_TRIGGER_PATH])
+        if not force:
+            if signature == current.signature:
+                return False
+            triggered = signature[RELOAD_TRIGGER_PATH] != current.signature.get(RELOAD_TRIGGER_PATH)
+            if not triggered and content_hash(SOURCE_PATHS) == current.content_hash:
+                # Only mtimes moved; remember them so the files are not rehashed
+                current.signature = signature
+                return False
+
+        try:
+            # Prefer the precompiled artifact; refit from the sources if it
+            # is missing or was built from different files
+            try:
+                new_knowledge_base = load_artifact(
+                    content_hash(SOURCE_PATHS),
+                    build_keyword_matcher=build_keyword_matcher,
+                    root=ARTIFACT_ROOT,
+                    version=next_version,
+                )
+            except ArtifactError as e:
+                print(f"Not using knowledge base artifact: {e}")
+                new_knowledge_base = KnowledgeBase.load(
+                    CSV_PATH, RESPONSES_PATH, INTENTS_PATH,
+                    build_keyword_matcher=build_keyword_matcher,
+                    version=next_version,
+                )
+        except Exception as e:
+            print(f"Error loading data files: {str(e)}")
+            print(f"Exception type: {type(e)}")
+            import traceback
+            print(f"Traceback: {traceback.format_exc()}")
+            if current is None:
+                # Serve the fallback answer rather than failing every request
+                knowledge_base = KnowledgeBase(keyword_matcher=build_keyword_matcher({}), signature=signature)
+            return False
+
+        new_knowledge_base.signature = signature
+        # A single reference assignment: readers see the old or the new
+        # snapshot, never a half-built one. The response cache is keyed on
+        # the version, so it is invalidated by the swap.
+        knowledge_base = new_knowledge_base
+        print(f"Knowledge base version {new_knowledge_base.version} loaded")
+        return True
+
+def reload_knowledge_base_if_changed():
+    return load_knowledge_base(force=False)
+
+def request_knowledge_base_reload():
+    """Reload in the background here and signal the other workers."""
+    with open(RELOAD_TRIGGER_PATH, 'a'):
+        os.utime(RELOAD_TRIGGER_PATH, None)
+    threading.Thread(target=load_knowledge_base, name='knowledge-base-reload', daemon=True).start()
+
+def start_knowledge_base_watcher(interval=30):
+    """Poll the source files every `interval` seconds and reload on change."""
+    global _knowledge_base_watcher, _watcher_interval
+    if _knowledge_base_watcher is None:
+        _knowledge_base_watcher = KnowledgeBaseWatcher(reload_knowledge_base_if_changed, interval)
+        _knowledge_base_watcher.start()
+        _watcher_interval = interval
+    return _knowledge_base_watcher
+
+def share_knowledge_base():
+    """Build the engine in the gunicorn master so preloaded workers share it.
+
+    Workers forked afterwards start with the snapshot already in memory
+    and share its pages copy-on-write. Freezing the collector moves every
+    object made so far out of the generations it scans, so collections
+    in the workers no longer write to those objects and copy their pages.
+    The master's watcher is stopped; each worker restarts its own.
+    """
+    global _knowledge_base_watcher
+    warmup()
+    if _knowledge_base_watcher is not None:
+        _knowledge_base_watcher.stop()
+        _knowledge_base_watcher = None
+    gc.collect()
+    gc.freeze()
+
+def _reset_after_fork():
+    # Threads do not survive fork and a lock held by one of them in the
+    # parent would never be released
+    global _reload_lock, _initial_load_lock, _knowledge_base_watcher
+    _reload_lock = threading.Lock()
+    _initial_load_lock = threading.Lock()
+    _knowledge_base_watcher = None
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+def restart_after_fork():
+    """Restart in a forked worker the background threads the parent had started."""
+    if _watcher_interval is not None:
+        start_knowledge_base_watcher(_watcher_interval)
+    if notice_cache.started:
+        notice_cache.start()
+    if outbox.started:
+        outbox.start()
+
+def get_knowledge_base():
+    """Return the current knowledge base, loading it on first use."""
+    kb = knowledge_base
+    if kb is None:
+        with _initial_load_lock:
+            if knowledge_base is None:
+                load_knowledge_base()
+        kb = knowledge_base
+        # Served lazily, without warmup(): /healthz is ready from here on
+        _ready.set()
+    return kb
+
+def ensure_nltk_data():
+    import nltk
+
+    # Download required NLTK data
+    try:
+        nltk.data.find('tokenizers/punkt')
+    except LookupError:
+        nltk.download('punkt')
+
+    try:
+        nltk.data.find('corpora/stopwords')
+    except LookupError:
+        nltk.download('stopwords')
+
+def warmup():
+    """Build the engine ahead of traffic, e.g. from gunicorn's post_fork hook."""
+    if _ready.is_set():
+        return
+    ensure_nltk_data()
+    kb = get_knowledge_base()
+    # Run one message through every stage so lazy imports and first-call
+    # setup happen now rather than on a student's request
+    route_message("warmup", kb)
+    _ready.set()
+    print(f"Chatbot engine warm (knowledge base version {kb.version})")
+
+def is_ready():
+    return _ready.is_set()
+
+# Minimum cosine similarity for a CSV answer (raised from 0.3 to 0.4)
+CSV_MATCH_THRESHOLD = 0.4
 
 def clean_text(text):
     # Convert to lowercase and remove extra spaces
@@ -107,128 +254,271 @@ def clean_text(text):
     text = re.sub(r'[^\w\s?]', '', text)
     return text
 
-def find_best_match(user_message, questions):
-    if vectorizer is None or question_vectors is None:
-        print("Vectorizer or question vectors not initialized")
-        return -1
-        
-    # Clean and vectorize user message
-    user_message = clean_text(user_message)
-    user_vector = vectorizer.transform([user_message])
+def find_top_matches(user_message, k=3, kb=None):
+    if kb is None:
+        kb = get_knowledge_base()
+    if kb.question_index is None:
+        logger.debug("Vectorizer or question vectors not initialized")
+        return []
     
-    # Calculate cosine similarity
-    similarities = cosine_similarity(user_vector, question_vectors).flatten()
-    best_match_idx = similarities.argmax()
-    best_similarity = similarities[best_match_idx]
+    # Clean the message and score it against the pre-normalized questions
+    return kb.question_index.top_k(clean_text(user_message), k)
+
+def find_best_match(user_message, questions=None, kb=None):
+    matches = find_top_matches(user_message, k=1, kb=kb)
+    if not matches:
+        return -1
+    best_match_idx, best_similarity = matches[0]
     
-    print(f"Best similarity score: {best_similarity:.3f}")
+    logger.debug("Best similarity score: %.3f", best_similarity)
     
     # Return best match if similarity is above threshold
-    if best_similarity > 0.4:  # Increased threshold from 0.3 to 0.4
+    if best_similarity > CSV_MATCH_THRESHOLD:
         return best_match_idx
     
     return -1
 
-def get_intent_response(user_message):
-    user_message = user_message.lower()
-    user_tokens = set(re.findall(r'\w+', user_message))
-    best_match = None
-    best_score = 0
-    
-    print(f"User tokens: {user_tokens}")
-    
-    for intent in intents:
-        for pattern in intent.get('patterns', []):
-            pattern_tokens = set(re.findall(r'\w+', pattern.lower()))
-            if not pattern_tokens:
-                continue
-            common_tokens = user_tokens & pattern_tokens
-            score = len(common_tokens) / len(pattern_tokens)
-            print(f"Pattern: {pattern}, Score: {score:.3f}")
-            
-            if score > best_score and score >= 0.5:  # Reduced threshold from 0.6 to 0.5
-                best_score = score
-                best_match = intent
+def get_intent_response(user_message, kb=None):
+    if kb is None:
+        kb = get_knowledge_base()
+    # Only patterns sharing a token with the message are scored
+    best_match, best_score = kb.intent_index.best_match(user_message, threshold=0.5)
     
     if best_match:
-        print(f"Found intent match with score: {best_score:.3f}")
+        logger.debug("Found intent match with score: %.3f", best_score)
         return random.choice(best_match.get('responses', []))
     
-    print("No intent match found")
+    logger.debug("No intent match found")
     return None
 
-def get_bot_response(user_message):
+FALLBACK_RESPONSE = "I apologize, but I don't have specific information about that. Please try rephrasing your question or ask something else."
+
+def make_reply(response, route, suggestions=None):
+    return {'response': response, 'route': route, 'suggestions': suggestions or []}
+
+def reply_cache_key(user_message):
+    """Cache key for a message: the lowercased text routing works on.
+
+    Every stage matches on the message lowercased and stripped, so two
+    messages with the same key always get the same reply. clean_text()
+    would be too loose: it drops punctuation that keyword routing sees
+    ("time-table" and "timetable").
+    """
+    return user_message.lower().strip() if user_message else ''
+
+def copy_reply(reply):
+    """A reply the caller may change without touching the cached one."""
+    return dict(reply, suggestions=[dict(suggestion) for suggestion in reply['suggestions']])
+
+def get_bot_reply(user_message):
+    """Answer a message through the response cache."""
+    trace = Trace()
+    kb = get_knowledge_base()
+    cache_key = reply_cache_key(user_message)
+    if not cache_key:
+        reply = route_message(user_message, kb, trace)
+        metrics.record(trace, reply['route'])
+        return reply
+    
+    with trace.stage("cache"):
+        reply = response_cache.get(cache_key, version=kb.version)
+    if reply is not None:
+        metrics.record(trace, "cache")
+        return copy_reply(reply)
+    
+    reply = route_message(user_message, kb, trace)
+    response_cache.put(cache_key, copy_reply(reply), route=reply['route'], version=kb.version)
+    metrics.record(trace, reply['route'])
+    return reply
+
+def export_metrics():
+    """Latency histograms per answering route and per stage, plus cache counters."""
+    exported = metrics.export()
+    exported['cache'] = response_cache.stats()
+    exported['notices'] = notice_cache.stats()
+    exported['outbox'] = outbox.stats()
+    return exported
+
+def route_message(user_message, kb=None, trace=NULL_TRACE):
+    """Answer a message and report the route that answered it.
+
+    Returns a dict with 'response', 'route' and 'suggestions'; suggestions
+    holds the top CSV questions whenever the TF-IDF stage was reached, so
+    the UI can offer "did you mean".
+    """
+    if kb is None:
+        kb = get_knowledge_base()
     try:
-        if not user_message:
-            return "Please enter a message."
-        
-        message_lower = user_message.lower().strip()
-        print(f"\nProcessing message: {message_lower}")
-        
-        # Check for document requests
-        if any(word in message_lower for word in ["fee", "fees"]):
-            for course in ["btech", "mtech", "mba"]:
-                if course in message_lower:
-                    response = ptu_utils.get_document_response("fee_structure", course)
-                    print(f"Found fee structure response for {course}")
-                    return response
-        
-        if any(word in message_lower for word in ["timetable", "time table"]):
-            for course in ["btech", "mtech", "mba"]:
-                if course in message_lower:
-                    response = ptu_utils.get_document_response("timetable", course)
-                    print(f"Found timetable response for {course}")
-                    return response
+        user_message = correct_spelling(user_message, kb, trace)
+        reply = match_rules(user_message, kb, trace)
+        if reply is None:
+            message_lower = user_message.lower().strip()
+            with trace.stage("csv"):
+                top_matches = find_top_matches(message_lower, k=3, kb=kb) if kb.questions else []
+                reply = match_csv(message_lower, top_matches, kb)
+        return reply
         
-        if "syllabus" in message_lower:
-            for course in ["btech", "mtech", "mba"]:
-                if course in message_lower:
-                    response = ptu_utils.get_document_response("syllabus", course)
-                    print(f"Found syllabus response for {course}")
-                    return response
-        
-        # Check for notice requests
-        if any(word in message_lower for word in ["notice", "notices", "notification"]):
-            notices = ptu_utils.get_notices()
+    except Exception as e:
+        return error_reply(e)
+
+def error_reply(e):
+    logger.exception("Error processing message: %s", e)
+    return make_reply("I'm having trouble processing your request. Please try again.", "error")
+
+def correct_spelling(user_message, kb, trace=NULL_TRACE):
+    """Replace words the knowledge base does not know with their closest known word."""
+    if not user_message:
+        return user_message
+    with trace.stage("spelling"):
+        corrected = kb.spelling.correct(user_message)
+    if corrected != user_message:
+        logger.debug("Corrected spelling: %s -> %s", user_message, corrected)
+    return corrected
+
+def match_rules(user_message, kb, trace=NULL_TRACE):
+    """Run every stage before the CSV lookup; None means fall through to it."""
+    if not user_message:
+        return make_reply("Please enter a message.", "empty")
+    
+    message_lower = user_message.lower().strip()
+    logger.debug("Processing message: %s", message_lower)
+    
+    # Find every routing keyword in one pass over the message
+    with trace.stage("keywords"):
+        matches = kb.keyword_matcher.match(message_lower)
+    
+    # Check for document requests
+    courses = matches.get("course")
+    if courses:
+        for doc_type, _ in DOCUMENT_KEYWORDS:
+            if doc_type in matches:
+                with trace.stage("document"):
+                    response = ptu_utils.get_document_response(doc_type, courses[0])
+                logger.debug("Found %s response for %s", doc_type, courses[0])
+                return make_reply(response, "document")
+    
+    # Check for notice requests
+    if "notices" in matches:
+        with trace.stage("notices"):
+            notices = notice_cache.get()
             response = ptu_utils.format_notice_response(notices)
-            print("Found notice response")
-            return response
-        
-        # Check basic responses from JSON
-        if responses:
-            for pattern, response in responses.items():
-                if pattern.lower() in message_lower:
-                    print(f"Found matching pattern in responses.json: {pattern}")
-                    return response
-        
-        # Check intents.json
-        intent_response = get_intent_response(user_message)
-        if intent_response:
-            print("Found matching intent")
-            return intent_response
-        
-        # Check CSV data if available
-        if not df.empty:
-            questions = df['User Query (Pattern)'].tolist()
-            best_match_idx = find_best_match(message_lower, questions)
-            
-            if best_match_idx != -1:
-                matched_question = questions[best_match_idx]
-                print(f"Found match in CSV: '{matched_question}' for query: '{message_lower}'")
-                return df.iloc[best_match_idx]['Bot Response']
-            else:
-                print("No good match found in CSV data")
-        else:
-            print("CSV data is empty")
-        
-        print("No matching response found")
-        return "I apologize, but I don't have specific information about that. Please try rephrasing your question or ask something else."
+        logger.debug("Found notice response")
+        return make_reply(response, "notices")
+    
+    # Check basic responses from JSON
+    if "responses" in matches:
+        pattern = matches["responses"][0]
+        logger.debug("Found matching pattern in responses.json: %s", pattern)
+        return make_reply(kb.responses[pattern], "responses")
+    
+    # Check intents.json
+    with trace.stage("intents"):
+        intent_response = get_intent_response(user_message, kb)
+    if intent_response:
+        return make_reply(intent_response, "intents")
+    
+    return None
+
+def match_csv(message_lower, top_matches, kb):
+    """Build the CSV (or fallback) reply from the top TF-IDF matches."""
+    # Check CSV data if available
+    if not kb.questions:
+        logger.debug("CSV data is empty")
+        return make_reply(FALLBACK_RESPONSE, "fallback")
+    
+    suggestions = [
+        {'question': kb.questions[idx], 'score': round(score, 3)}
+        for idx, score in top_matches
+    ]
+    
+    if top_matches and top_matches[0][1] > CSV_MATCH_THRESHOLD:
+        best_match_idx = top_matches[0][0]
+        logger.debug("Found match in CSV: '%s' for query: '%s'", suggestions[0]['question'], message_lower)
+        return make_reply(kb.answer(best_match_idx), "csv", suggestions)
+    
+    logger.debug("No good match found in CSV data")
+    return make_reply(FALLBACK_RESPONSE, "fallback", suggestions)
+
+def get_bot_replies(user_messages):
+    """Answer a batch of messages, running the TF-IDF stage once for all.
+
+    Messages that reach the CSV lookup are vectorized with a single
+    transform() and scored with one sparse matrix product. Repeated
+    messages in the batch are answered once. Each message is recorded in
+    the metrics under the route that answered it, as get_bot_reply() does;
+    the shared CSV stage is split evenly between the messages it scored.
+    """
+    kb = get_knowledge_base()
+    replies = [None] * len(user_messages)
+    traces = [Trace() for _ in user_messages]
+    # Route each message is recorded under; None means its reply's route
+    answered_by = [None] * len(user_messages)
+    # Cache key -> index of the first message with that key
+    first_seen = {}
+    fresh = []
+    duplicates = []
+    csv_pending = []
+    
+    for i, user_message in enumerate(user_messages):
+        trace = traces[i]
+        cache_key = reply_cache_key(user_message)
+        if cache_key:
+            if cache_key in first_seen:
+                duplicates.append((i, first_seen[cache_key]))
+                continue
+            first_seen[cache_key] = i
+            with trace.stage("cache"):
+                cached = response_cache.get(cache_key, version=kb.version)
+            if cached is not None:
+                replies[i] = copy_reply(cached)
+                answered_by[i] = "cache"
+                continue
+            fresh.append((cache_key, i))
         
-    except Exception as e:
-        print(f"Error processing message: {str(e)}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
-        return "I'm having trouble processing your request. Please try again."
+        try:
+            user_message = correct_spelling(user_message, kb, trace)
+            replies[i] = match_rules(user_message, kb, trace)
+        except Exception as e:
+            replies[i] = error_reply(e)
+        if replies[i] is None:
+            csv_pending.append((i, user_message))
+    
+    if csv_pending:
+        messages_lower = [user_message.lower().strip() for _, user_message in csv_pending]
+        csv_trace = Trace()
+        try:
+            with csv_trace.stage("csv_batch"):
+                if not kb.questions or kb.question_index is None:
+                    all_matches = [[] for _ in csv_pending]
+                else:
+                    scores = kb.question_index.scores([clean_text(message) for message in messages_lower])
+                    all_matches = [QuestionIndex.top_k_from_scores(row, 3) for row in scores]
+                for (i, _), message_lower, top_matches in zip(csv_pending, messages_lower, all_matches):
+                    replies[i] = match_csv(message_lower, top_matches, kb)
+        except Exception as e:
+            for i, _ in csv_pending:
+                replies[i] = error_reply(e)
+        share = csv_trace.elapsed() / len(csv_pending)
+        for i, _ in csv_pending:
+            traces[i].stages.append(("csv_batch", share))
+    
+    # Remember fresh answers for the single-message path as well
+    for cache_key, i in fresh:
+        response_cache.put(cache_key, copy_reply(replies[i]), route=replies[i]['route'], version=kb.version)
+    for i, original in duplicates:
+        with traces[i].stage("cache"):
+            replies[i] = copy_reply(replies[original])
+        answered_by[i] = "cache"
+    for trace, route, reply in zip(traces, answered_by, replies):
+        # A message's own stages; its Trace was started with the batch
+        metrics.record(trace, route or reply['route'], seconds=sum(seconds for _, seconds in trace.stages))
+    return replies
+
+def get_bot_responses(user_messages):
+    return [reply['response'] for reply in get_bot_replies(user_messages)]
+
+def get_bot_response(user_message):
+    return get_bot_reply(user_message)['response']
 
 @app.route('/')
 def home():
@@ -250,7 +540,8 @@ def chat():
             chat_histories[user_id] = []
         
         # Get bot response
-        response = get_bot_response(user_message)
+        reply = get_bot_reply(user_message)
+        response = reply['response']
         
         # Save to chat history
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -260,7 +551,7 @@ def chat():
             'bot_response': response
         })
         
-        return jsonify({'response': response})
+        return jsonify({'response': response, 'suggestions': reply['suggestions']})
         
     except Exception as e:
         print(f"Error in chat endpoint: {str(e)}")
@@ -337,11 +628,8 @@ def send_support_email():
         
         msg.attach(MIMEText(body, 'plain'))
         
-        # Send email
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(EMAIL_USERNAME, EMAIL_PASSWORD)
-            server.send_message(msg)
+        # Queue the email; the outbox thread sends it over a shared SMTP connection
+        outbox.enqueue(msg)
         
         return jsonify({'success': True, 'message': 'Email sent successfully'})
         
@@ -350,6 +638,8 @@ def send_support_email():
         return jsonify({'success': False, 'message': 'Failed to send email'})
 
 if __name__ == '__main__':
+    # Send anything left in the outbox by a previous run
+    outbox.start()
     print("\nStarting chatbot server...")
     print("Access the chatbot at http://localhost:5000")
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,226 @@
+"""Precompiled knowledge base artifact.
+
+`python -m chatbot.kb_artifact` (run from the project root) fits the
+TF-IDF model once and writes everything a worker needs to answer
+questions into data/kb_artifact/<source hash>/:
+
+    manifest.json          format version, source content hash, shapes
+    vocabulary.json        TF-IDF terms in column order
+    idf.npy                IDF weights
+    question_*.npy         CSR arrays of the L2-normalized question matrix
+    questions.json         CSV questions, row order
+    answers.json           distinct CSV answers
+    answer_ids.npy         row -> index into answers.json
+    responses.json         responses.json as loaded
+    intents.json           intents as loaded
+    intent_tokens.json     intent index tokens
+    intent_*.npy           intent index postings and pattern tables
+    spelling_words.json    spelling corrector vocabulary
+    spelling_*.npy         word frequencies, and the delete index as
+                           packed keys plus CSR postings
+
+Workers memory-map the .npy files instead of refitting, so forked workers
+share those pages through the page cache. An artifact is only used when
+its recorded hash matches the current source files. The spelling
+vocabulary also includes the routing keywords from chatbot.py, which the
+hash does not cover; if they changed since the build, the corrector is
+rebuilt on load instead.
+"""
+import argparse
+import json
+import os
+import shutil
+from datetime import datetime
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from chatbot.knowledge_base import (
+    CSV_PATH, RESPONSES_PATH, INTENTS_PATH,
+    KnowledgeBase, PackedStrings, content_hash, intern_answers, read_sources, source_signature,
+)
+from chatbot.matchers import IntentIndex, QuestionIndex, SpellingCorrector
+
+FORMAT_VERSION = 2
+ARTIFACT_ROOT = 'data/kb_artifact'
+
+INTENT_TABLES = ['postings_indptr', 'postings_ids', 'pattern_lengths', 'pattern_intent_ids']
+SPELLING_TABLES = ['frequencies', 'delete_indptr', 'delete_word_ids']
+
+
+class ArtifactError(Exception):
+    """Raised when an artifact is missing, stale or in an unknown format."""
+
+
+def artifact_path(root, source_hash):
+    return os.path.join(root, source_hash[:16])
+
+
+def _write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def _read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def build_artifact(build_keyword_matcher, root=ARTIFACT_ROOT, csv_path=CSV_PATH,
+                   responses_path=RESPONSES_PATH, intents_path=INTENTS_PATH):
+    """Fit the knowledge base from the sources and write its artifact; returns the path."""
+    paths = [csv_path, responses_path, intents_path]
+    source_hash = content_hash(paths)
+    path = artifact_path(root, source_hash)
+    try:
+        if _read_json(os.path.join(path, 'manifest.json')).get('format_version') == FORMAT_VERSION:
+            print(f"Artifact for these sources already exists at {path}")
+            return path
+    except (OSError, ValueError):
+        pass
+
+    questions, row_answers, responses, intents = read_sources(csv_path, responses_path, intents_path)
+    if not questions:
+        raise ArtifactError(f"Cannot build an artifact without the CSV at {csv_path}")
+
+    vectorizer = TfidfVectorizer()
+    question_vectors = vectorizer.fit_transform(questions)
+    matrix = QuestionIndex(vectorizer, question_vectors).matrix
+    intent_tables = IntentIndex(intents).to_tables()
+    # Many CSV rows share the same response text
+    answers, answer_ids = intern_answers(row_answers)
+    keyword_matcher = build_keyword_matcher(responses)
+    spelling_tables = KnowledgeBase(
+        questions=questions, answers=answers, answer_ids=answer_ids, responses=responses,
+        intents=intents, keyword_matcher=keyword_matcher,
+    ).spelling.to_tables()
+    delete_keys = PackedStrings(spelling_tables['delete_keys'])
+
+    # Write into a temporary directory and rename it into place at the end
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    _write_json(os.path.join(tmp_path, 'vocabulary.json'), vectorizer.get_feature_names_out().tolist())
+    np.save(os.path.join(tmp_path, 'idf.npy'), vectorizer.idf_)
+    np.save(os.path.join(tmp_path, 'question_data.npy'), matrix.data)
+    np.save(os.path.join(tmp_path, 'question_indices.npy'), matrix.indices)
+    np.save(os.path.join(tmp_path, 'question_indptr.npy'), matrix.indptr)
+    _write_json(os.path.join(tmp_path, 'questions.json'), questions)
+    _write_json(os.path.join(tmp_path, 'answers.json'), answers)
+    np.save(os.path.join(tmp_path, 'answer_ids.npy'), answer_ids)
+    _write_json(os.path.join(tmp_path, 'responses.json'), responses)
+    _write_json(os.path.join(tmp_path, 'intents.json'), intents)
+    _write_json(os.path.join(tmp_path, 'intent_tokens.json'), intent_tables['tokens'])
+    for name in INTENT_TABLES:
+        np.save(os.path.join(tmp_path, f'intent_{name}.npy'), intent_tables[name])
+    _write_json(os.path.join(tmp_path, 'spelling_words.json'), spelling_tables['words'])
+    for name in SPELLING_TABLES:
+        np.save(os.path.join(tmp_path, f'spelling_{name}.npy'), spelling_tables[name])
+    np.save(os.path.join(tmp_path, 'spelling_delete_keys.npy'), np.frombuffer(delete_keys.blob, dtype=np.uint8))
+    np.save(os.path.join(tmp_path, 'spelling_delete_offsets.npy'), delete_keys.offsets)
+
+    # The manifest goes last: an artifact without one is never loaded
+    _write_json(os.path.join(tmp_path, 'manifest.json'), {
+        'format_version': FORMAT_VERSION,
+        'source_hash': source_hash,
+        'sources': paths,
+        'created_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+        'question_shape': list(matrix.shape),
+        'questions': len(questions),
+        'answers': len(answers),
+        'responses': len(responses),
+        'intents': len(intents),
+        'spelling': dict(spelling_tables['settings'], keywords=keyword_matcher.keywords),
+    })
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    print(f"Wrote knowledge base artifact to {path}")
+    return path
+
+
+def load_artifact(source_hash, build_keyword_matcher, root=ARTIFACT_ROOT, version=0):
+    """Load the artifact built from sources with this content hash."""
+    path = artifact_path(root, source_hash)
+    try:
+        manifest = _read_json(os.path.join(path, 'manifest.json'))
+    except (OSError, ValueError) as e:
+        raise ArtifactError(f"No usable artifact at {path}: {e}")
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ArtifactError(f"Artifact format {manifest.get('format_version')} is not {FORMAT_VERSION}")
+    if manifest.get('source_hash') != source_hash:
+        raise ArtifactError("Artifact was built from different source files")
+
+    def mapped(name):
+        # A plain ndarray view of the mapping: slicing or indexing a
+        # np.memmap builds a new memmap object each time
+        return np.asarray(np.load(os.path.join(path, name), mmap_mode='r'))
+
+    # Rebuild the fitted vectorizer from its vocabulary and IDF weights
+    terms = _read_json(os.path.join(path, 'vocabulary.json'))
+    vectorizer = TfidfVectorizer(vocabulary={term: i for i, term in enumerate(terms)})
+    vectorizer.idf_ = mapped('idf.npy')
+
+    matrix = csr_matrix(
+        (mapped('question_data.npy'), mapped('question_indices.npy'), mapped('question_indptr.npy')),
+        shape=tuple(manifest['question_shape']),
+        copy=False,
+    )
+
+    questions = _read_json(os.path.join(path, 'questions.json'))
+    answers = _read_json(os.path.join(path, 'answers.json'))
+
+    responses = _read_json(os.path.join(path, 'responses.json'))
+    intents = _read_json(os.path.join(path, 'intents.json'))
+    intent_index = IntentIndex.from_tables(
+        intents,
+        _read_json(os.path.join(path, 'intent_tokens.json')),
+        *[mapped(f'intent_{name}.npy') for name in INTENT_TABLES],
+    )
+
+    keyword_matcher = build_keyword_matcher(responses)
+    spelling = None
+    settings = dict(manifest['spelling'])
+    if settings.pop('keywords') == keyword_matcher.keywords:
+        spelling = SpellingCorrector.from_tables(
+            _read_json(os.path.join(path, 'spelling_words.json')),
+            delete_keys=PackedStrings.from_arrays(mapped('spelling_delete_keys.npy'),
+                                                  mapped('spelling_delete_offsets.npy')),
+            **{name: mapped(f'spelling_{name}.npy') for name in SPELLING_TABLES},
+            **settings,
+        )
+    else:
+        print("Routing keywords changed since the artifact was built; rebuilding the spelling index")
+
+    print(f"Loaded knowledge base artifact from {path}")
+    return KnowledgeBase(
+        questions=questions,
+        answers=answers,
+        answer_ids=mapped('answer_ids.npy'),
+        responses=responses,
+        intents=intents,
+        vectorizer=vectorizer,
+        question_vectors=matrix,
+        question_index=QuestionIndex(vectorizer, matrix, normalized=True),
+        intent_index=intent_index,
+        keyword_matcher=keyword_matcher,
+        spelling=spelling,
+        version=version,
+        signature=source_signature(manifest['sources']),
+        content_hash=source_hash,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the precompiled chatbot knowledge base artifact.')
+    parser.add_argument('--output', default=ARTIFACT_ROOT, help='artifact root directory')
+    args = parser.parse_args()
+    # The routing keywords are part of the spelling vocabulary
+    from chatbot.chatbot import build_keyword_matcher
+    build_artifact(build_keyword_matcher, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+import csv
+import hashlib
+import json
+import os
+import threading
+
+from chatbot.matchers import IntentIndex, KeywordMatcher, QuestionIndex, SpellingCorrector
+
+# Knowledge base source files, relative to the project root
+CSV_PATH = 'Structured_Chatbot_Data    chatbot csv.csv'
+RESPONSES_PATH = 'data/responses.json'
+INTENTS_PATH = 'data/intents.json'
+SOURCE_PATHS = [CSV_PATH, RESPONSES_PATH, INTENTS_PATH]
+
+
+def source_signature(paths):
+    """Return {path: (mtime_ns, size)} for the given files; missing files map to None."""
+    signature = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature[path] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            signature[path] = None
+    return signature
+
+
+def content_hash(paths):
+    """SHA-256 over the contents of the given files, in order."""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.encode('utf-8'))
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 16), b''):
+                    digest.update(chunk)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def intern_answers(row_answers):
+    """Store each distinct answer once; returns (answers, answer_ids) with one id per row."""
+    import numpy as np
+
+    answers = []
+    ids = {}
+    answer_ids = []
+    for answer in row_answers:
+        if answer not in ids:
+            ids[answer] = len(answers)
+            answers.append(answer)
+        answer_ids.append(ids[answer])
+    return answers, np.asarray(answer_ids, dtype=np.int32)
+
+
+def read_sources(csv_path, responses_path, intents_path):
+    """Read the CSV, responses and intents; returns (questions, row_answers, responses, intents)."""
+    questions = []
+    row_answers = []
+    if os.path.exists(csv_path):
+        with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                # Missing cells become empty strings
+                questions.append(row.get('User Query (Pattern)') or '')
+                row_answers.append(row.get('Bot Response') or '')
+        print(f"Successfully loaded CSV file with {len(questions)} rows")
+    else:
+        print(f"Error: CSV file not found at {csv_path}")
+        print(f"Current working directory: {os.getcwd()}")
+
+    # Load responses JSON if exists
+    responses = {}
+    if os.path.exists(responses_path):
+        with open(responses_path, 'r', encoding='utf-8') as f:
+            responses = json.load(f)
+            print("Successfully loaded responses JSON")
+            print(f"Number of responses: {len(responses)}")
+    else:
+        print(f"Error: JSON file not found at {responses_path}")
+
+    # Load intents JSON if exists
+    intents = []
+    if os.path.exists(intents_path):
+        with open(intents_path, 'r', encoding='utf-8') as f:
+            intents = json.load(f).get('intents', [])
+            print("Successfully loaded intents JSON")
+            print(f"Number of intents: {len(intents)}")
+    else:
+        print(f"Error: Intents JSON file not found at {intents_path}")
+
+    return questions, row_answers, responses, intents
+
+
+class PackedStrings:
+    """Read-only sequence of strings kept as one UTF-8 blob plus offsets.
+
+    A list of str objects has its refcounts written whenever an item is
+    read, which copies those pages into every forked worker. Here the
+    items live in a single bytes object and an offsets array, so reads
+    only touch those two objects' headers and the data stays shared.
+    """
+
+    def __init__(self, strings=()):
+        import numpy as np
+
+        encoded = [str(string).encode('utf-8') for string in strings]
+        self.blob = b''.join(encoded)
+        self.offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(item) for item in encoded], out=self.offsets[1:])
+
+    @classmethod
+    def from_arrays(cls, blob, offsets):
+        """Wrap a blob (bytes or a uint8 array, e.g. memory-mapped) and its offsets without copying."""
+        packed = cls()
+        packed.blob = blob
+        packed.offsets = offsets
+        return packed
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('PackedStrings index out of range')
+        return bytes(self.blob[self.offsets[index]:self.offsets[index + 1]]).decode('utf-8')
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+class KnowledgeBase:
+    """Immutable snapshot of everything the chatbot answers from.
+
+    A snapshot is fully built before it is published, so a request that
+    picked up one snapshot keeps using it even if a reload swaps in a new
+    one while it runs. CSV questions and the distinct answers are packed
+    strings, with an array of answer ids per row, so the row a TF-IDF
+    lookup returns is answered with two index operations.
+    scikit-learn is only imported when a snapshot is built.
+    """
+
+    def __init__(self, questions=None, answers=None, answer_ids=None, responses=None,
+                 intents=None, vectorizer=None, question_vectors=None, keyword_matcher=None,
+                 version=0, signature=None, content_hash=None, question_index=None,
+                 intent_index=None, spelling=None):
+        self.questions = questions if isinstance(questions, PackedStrings) else PackedStrings(questions or [])
+        self.answers = answers if isinstance(answers, PackedStrings) else PackedStrings(answers or [])
+        self.answer_ids = answer_ids if answer_ids is not None else []
+        self.responses = responses or {}
+        self.intents = intents or []
+        self.vectorizer = vectorizer
+        self.question_vectors = question_vectors
+        self.question_index = question_index
+        if question_index is None and vectorizer is not None and question_vectors is not None:
+            self.question_index = QuestionIndex(vectorizer, question_vectors)
+        self.intent_index = intent_index
+        if intent_index is None:
+            self.intent_index = IntentIndex(self.intents)
+        self.keyword_matcher = keyword_matcher or KeywordMatcher()
+        self.spelling = spelling
+        if spelling is None:
+            self.spelling = SpellingCorrector(self.vocabulary_texts())
+        self.version = version
+        self.signature = signature or {}
+        self.content_hash = content_hash
+
+    def answer(self, row):
+        """Bot response for a CSV row."""
+        return self.answers[self.answer_ids[row]]
+
+    def vocabulary_texts(self):
+        """Yield every text whose words count as correctly spelled."""
+        yield from self.questions
+        for answer_id in self.answer_ids:
+            yield self.answers[answer_id]
+        for pattern, response in self.responses.items():
+            yield pattern
+            yield response
+        for intent in self.intents:
+            yield from intent.get('patterns', [])
+            yield from intent.get('responses', [])
+        yield from self.keyword_matcher.keywords
+
+    @classmethod
+    def load(cls, csv_path, responses_path, intents_path, build_keyword_matcher, version=0):
+        """Read the source files and build a new snapshot; raises on failure."""
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        paths = [csv_path, responses_path, intents_path]
+        signature = source_signature(paths)
+        digest = content_hash(paths)
+
+        questions, row_answers, responses, intents = read_sources(csv_path, responses_path, intents_path)
+        answers, answer_ids = intern_answers(row_answers)
+        vectorizer = None
+        question_vectors = None
+        if questions:
+            # Initialize TF-IDF vectorizer
+            vectorizer = TfidfVectorizer()
+            question_vectors = vectorizer.fit_transform(questions)
+
+        return cls(
+            questions=questions,
+            answers=answers,
+            answer_ids=answer_ids,
+            responses=responses,
+            intents=intents,
+            vectorizer=vectorizer,
+            question_vectors=question_vectors,
+            keyword_matcher=build_keyword_matcher(responses),
+            version=version,
+            signature=signature,
+            content_hash=digest,
+        )
+
+
+class KnowledgeBaseWatcher(threading.Thread):
+    """Daemon thread that calls check() every `interval` seconds."""
+
+    def __init__(self, check, interval=30):
+        super().__init__(name='knowledge-base-watcher', daemon=True)
+        self.check = check
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Error checking knowledge base files: {e}")
+
+    def stop(self):
+        self._stopped.set()
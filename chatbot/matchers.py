@@ -0,0 +1,429 @@
+import re
+from bisect import bisect_left
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Split text into the set of lowercase word tokens used for intent matching."""
+    return set(TOKEN_PATTERN.findall(str(text).lower()))
+
+
+def csr_tables(mapping):
+    """Flatten {key: [ids]} into (sorted keys, indptr array, ids array)."""
+    import numpy as np
+
+    keys = sorted(mapping)
+    indptr = [0]
+    ids = []
+    for key in keys:
+        ids.extend(mapping[key])
+        indptr.append(len(ids))
+    return keys, np.asarray(indptr, dtype=np.int32), np.asarray(ids, dtype=np.int32)
+
+
+class CsrPostings:
+    """Read-only {key: [ids]} lookups over the tables csr_tables() returns.
+
+    The arrays are used as given, memory-mapped when they come from an
+    artifact, and a key's ids are only sliced out when it is looked up, so
+    forked workers keep sharing the pages instead of each holding a copy.
+    Keys are found by binary search in the sorted `keys` sequence. With
+    `values`, lookups return values[id] instead of the ids.
+    """
+
+    def __init__(self, keys, indptr, ids, values=None):
+        self.keys = keys
+        self.indptr = indptr
+        self.ids = ids
+        self.values = values
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _position(self, key):
+        position = bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            return position
+        return None
+
+    def __contains__(self, key):
+        return self._position(key) is not None
+
+    def array(self, key):
+        """The key's ids as a view into `ids`, or None."""
+        position = self._position(key)
+        if position is None:
+            return None
+        return self.ids[self.indptr[position]:self.indptr[position + 1]]
+
+    def get(self, key, default=None):
+        ids = self.array(key)
+        if ids is None:
+            return default
+        ids = ids.tolist()
+        if self.values is None:
+            return ids
+        return [self.values[i] for i in ids]
+
+
+class IntentIndex:
+    """Inverted index from token to intent patterns, built once from intents.json.
+
+    The postings and pattern tables are flat arrays (see csr_tables()), so
+    an index loaded from an artifact scores messages straight from the
+    memory-mapped pages.
+    """
+
+    def __init__(self, intents):
+        import numpy as np
+
+        self.intents = list(intents)
+        pattern_intent_ids = []
+        pattern_lengths = []
+        # Token -> ids of the patterns that contain it
+        postings = {}
+
+        # Pattern ids follow intents.json order so ties resolve like a linear scan
+        for intent_id, intent in enumerate(self.intents):
+            for pattern in intent.get('patterns', []):
+                pattern_tokens = tokenize(pattern)
+                if not pattern_tokens:
+                    continue
+                pattern_id = len(pattern_lengths)
+                pattern_intent_ids.append(intent_id)
+                pattern_lengths.append(len(pattern_tokens))
+                for token in pattern_tokens:
+                    postings.setdefault(token, []).append(pattern_id)
+
+        # Pattern id -> position of its intent and number of distinct tokens
+        self.pattern_intent_ids = np.asarray(pattern_intent_ids, dtype=np.int32)
+        self.pattern_lengths = np.asarray(pattern_lengths, dtype=np.int32)
+        self.postings = CsrPostings(*csr_tables(postings))
+
+    @classmethod
+    def from_tables(cls, intents, tokens, postings_indptr, postings_ids, pattern_lengths, pattern_intent_ids):
+        """Rebuild an index from the flat tables written by to_tables(), without copying them."""
+        index = cls([])
+        index.intents = list(intents)
+        index.pattern_intent_ids = pattern_intent_ids
+        index.pattern_lengths = pattern_lengths
+        index.postings = CsrPostings(tokens, postings_indptr, postings_ids)
+        return index
+
+    def to_tables(self):
+        """Return the postings as flat arrays: tokens plus CSR-style offsets."""
+        return {
+            'tokens': list(self.postings.keys),
+            'postings_indptr': self.postings.indptr,
+            'postings_ids': self.postings.ids,
+            'pattern_lengths': self.pattern_lengths,
+            'pattern_intent_ids': self.pattern_intent_ids,
+        }
+
+    def __len__(self):
+        return len(self.pattern_lengths)
+
+    def best_match(self, user_message, threshold=0.5):
+        """Return (intent, score) for the best scoring pattern, or (None, 0)."""
+        import numpy as np
+
+        # Count shared tokens only for patterns that share at least one token
+        postings = [self.postings.array(token) for token in tokenize(user_message)]
+        postings = [ids for ids in postings if ids is not None]
+        if not postings:
+            return None, 0
+        pattern_ids, common = np.unique(np.concatenate(postings), return_counts=True)
+        scores = common / self.pattern_lengths[pattern_ids]
+
+        eligible = np.flatnonzero(scores >= threshold)
+        if not len(eligible):
+            return None, 0
+        # argmax takes the first maximum, and pattern ids are sorted, so the
+        # earliest pattern wins a tie as in the original loop
+        best = eligible[np.argmax(scores[eligible])]
+        return self.intents[self.pattern_intent_ids[pattern_ids[best]]], float(scores[best])
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over routing keywords.
+
+    Rules are (route, key, keyword) triples. A single pass over the message
+    finds every keyword that occurs in it as a substring, the same test as
+    `keyword in message`, and reports the matched keys per route in the
+    order the rules were added.
+    """
+
+    def __init__(self, rules=()):
+        self.rules = []
+        self.keywords = []
+        # Rules with an empty keyword match every message
+        self._always = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for route, key, keyword in rules:
+            self._add(route, key, keyword)
+        self._build()
+
+    def __len__(self):
+        return len(self.rules)
+
+    def _add(self, route, key, keyword):
+        rule_id = len(self.rules)
+        self.rules.append((route, key))
+        self.keywords.append(keyword)
+        if not keyword:
+            self._always.append(rule_id)
+            return
+
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(rule_id)
+
+    def _build(self):
+        # Breadth-first pass to set failure links and merge outputs
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def match(self, text):
+        """Return {route: [keys]} for every rule whose keyword occurs in text."""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        hits = set(self._always)
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                hits.update(output[state])
+
+        matches = {}
+        for rule_id in sorted(hits):
+            route, key = self.rules[rule_id]
+            keys = matches.setdefault(route, [])
+            if key not in keys:
+                keys.append(key)
+        return matches
+
+
+class QuestionIndex:
+    """Cosine-similarity retrieval over the TF-IDF matrix of CSV questions.
+
+    Rows are L2-normalized once and kept as CSR, so a lookup is one sparse
+    dot product instead of re-normalizing the whole matrix per request.
+    numpy and scikit-learn are imported on first use so that importing
+    this module stays cheap.
+    """
+
+    def __init__(self, vectorizer, question_vectors, normalized=False):
+        from sklearn.preprocessing import normalize
+
+        self.vectorizer = vectorizer
+        if normalized:
+            # Already L2-normalized, e.g. memory-mapped from a build artifact
+            self.matrix = question_vectors
+        else:
+            self.matrix = normalize(question_vectors, norm='l2', copy=True).tocsr()
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def scores(self, queries):
+        """Return a (len(queries), n_questions) array of cosine similarities."""
+        from sklearn.preprocessing import normalize
+
+        query_vectors = normalize(self.vectorizer.transform(queries), norm='l2', copy=False)
+        return (self.matrix @ query_vectors.T).T.toarray()
+
+    def top_k(self, query, k=3):
+        """Return up to k (row, score) pairs, best first."""
+        return self.top_k_from_scores(self.scores([query])[0], k)
+
+    @staticmethod
+    def top_k_from_scores(scores, k=3):
+        import numpy as np
+
+        # A question sharing no term with the query scores 0 and is never a
+        # match or a suggestion; most rows are such zeros
+        positive = np.flatnonzero(scores > 0)
+        k = min(k, len(positive))
+        if k <= 0:
+            return []
+        positive_scores = scores[positive]
+        top = np.argpartition(-positive_scores, k - 1)[:k]
+        # Widen to every row tied with the k-th score, then order by score
+        # and row so ties go to the earliest question like argmax() did
+        candidates = positive[positive_scores >= positive_scores[top].min()]
+        order = np.lexsort((candidates, -scores[candidates]))[:k]
+        return [(int(row), float(scores[row])) for row in candidates[order]]
+
+
+def edit_distance(a, b, max_distance):
+    """Optimal string alignment distance, or max_distance + 1 once it is exceeded."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+class SpellingCorrector:
+    """SymSpell-style corrector for words outside the knowledge base vocabulary.
+
+    Every vocabulary word is indexed under all the strings obtained by
+    deleting up to max_distance characters from its prefix. A misspelled
+    token is looked up under its own deletes, so finding candidates is a
+    fixed number of dictionary lookups whatever the vocabulary size; only
+    those few candidates get a real edit distance check. Words the
+    vocabulary already knows are never changed.
+    """
+
+    def __init__(self, texts=(), max_distance=2, prefix_length=7, min_length=4, cache_size=10000):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.min_length = min_length
+        self.cache_size = cache_size
+        # Word -> number of occurrences, used to break ties between candidates
+        self.frequencies = {}
+        # Delete of a word prefix -> words it was derived from
+        self.deletes = {}
+        self._corrections = {}
+
+        for text in texts:
+            for token in TOKEN_PATTERN.findall(str(text).lower()):
+                self.frequencies[token] = self.frequencies.get(token, 0) + 1
+        for word in self.frequencies:
+            if word.isalpha() and len(word) >= self.min_length - self.max_distance:
+                for delete in self._prefix_deletes(word, self.max_distance):
+                    self.deletes.setdefault(delete, []).append(word)
+
+    @classmethod
+    def from_tables(cls, words, frequencies, delete_keys, delete_indptr, delete_word_ids,
+                    max_distance=2, prefix_length=7, min_length=4, cache_size=10000):
+        """Rebuild a corrector from the tables written by to_tables(), without copying the deletes."""
+        corrector = cls(max_distance=max_distance, prefix_length=prefix_length,
+                        min_length=min_length, cache_size=cache_size)
+        corrector.frequencies = dict(zip(words, frequencies.tolist()))
+        corrector.deletes = CsrPostings(delete_keys, delete_indptr, delete_word_ids, values=words)
+        return corrector
+
+    def to_tables(self):
+        """Return the vocabulary and its delete index as flat arrays."""
+        import numpy as np
+
+        words = sorted(self.frequencies)
+        word_ids = {word: i for i, word in enumerate(words)}
+        delete_keys, delete_indptr, delete_word_ids = csr_tables(
+            {delete: [word_ids[word] for word in delete_words] for delete, delete_words in self.deletes.items()}
+        )
+        return {
+            'words': words,
+            'frequencies': np.asarray([self.frequencies[word] for word in words], dtype=np.int32),
+            'delete_keys': delete_keys,
+            'delete_indptr': delete_indptr,
+            'delete_word_ids': delete_word_ids,
+            'settings': {
+                'max_distance': self.max_distance,
+                'prefix_length': self.prefix_length,
+                'min_length': self.min_length,
+            },
+        }
+
+    def __len__(self):
+        return len(self.frequencies)
+
+    def _prefix_deletes(self, word, max_distance):
+        prefix = word[:self.prefix_length]
+        found = {prefix}
+        frontier = [prefix]
+        for _ in range(max_distance):
+            next_frontier = []
+            for item in frontier:
+                for i in range(len(item)):
+                    delete = item[:i] + item[i + 1:]
+                    if delete not in found:
+                        found.add(delete)
+                        next_frontier.append(delete)
+            frontier = next_frontier
+        return found
+
+    def correct_token(self, token):
+        """Return the closest vocabulary word for an unknown token, else the token."""
+        if token in self.frequencies or len(token) < self.min_length or not token.isalpha():
+            return token
+        corrected = self._corrections.get(token)
+        if corrected is not None:
+            return corrected
+
+        # Short words tolerate one edit, longer ones up to max_distance
+        max_distance = 1 if len(token) < self.min_length + 2 else self.max_distance
+        best = None
+        seen = set()
+        for delete in self._prefix_deletes(token, max_distance):
+            for word in self.deletes.get(delete, ()):
+                if word in seen:
+                    continue
+                seen.add(word)
+                distance = edit_distance(token, word, max_distance)
+                if distance > max_distance:
+                    continue
+                # Fewest edits first, then the most frequent word, then alphabetical
+                key = (distance, -self.frequencies[word], word)
+                if best is None or key < best:
+                    best = key
+        corrected = best[2] if best else token
+
+        if len(self._corrections) >= self.cache_size:
+            self._corrections.clear()
+        self._corrections[token] = corrected
+        return corrected
+
+    def correct(self, text):
+        """Return text with unknown words replaced; text itself if nothing changed."""
+        frequencies = self.frequencies
+        if all(token in frequencies for token in TOKEN_PATTERN.findall(text.lower())):
+            return text
+        changed = False
+
+        def replace(match):
+            nonlocal changed
+            token = match.group(0).lower()
+            corrected = self.correct_token(token)
+            if corrected == token:
+                return match.group(0)
+            changed = True
+            return corrected
+
+        corrected_text = TOKEN_PATTERN.sub(replace, text)
+        return corrected_text if changed else text
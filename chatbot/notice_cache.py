@@ -0,0 +1,175 @@
+import os
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a service whose circuit is open."""
+
+
+class CircuitBreaker:
+    """Stop calling a failing service for a while instead of waiting on it.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    calls fail immediately for `reset_timeout` seconds. Then a single
+    trial call is let through (half open): success closes the circuit,
+    failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=3, reset_timeout=60, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def call(self, func, *args, **kwargs):
+        with self._lock:
+            state = self.state
+            if state == self.OPEN or (state == self.HALF_OPEN and self._trial_running):
+                raise CircuitOpenError(f"Circuit open after {self.failures} failures")
+            if state == self.HALF_OPEN:
+                self._trial_running = True
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._trial_running = False
+                self.failures += 1
+                if state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                    self.opened_at = self.clock()
+            raise
+        with self._lock:
+            self._trial_running = False
+            self.failures = 0
+            self.opened_at = None
+        return result
+
+
+class NoticeCache:
+    """Notices for the chat, served from memory and refreshed in the background.
+
+    get() never waits on the network: it returns the last fetched notices,
+    even when they are older than `ttl` (stale-while-revalidate), and asks
+    the refresher thread for a new fetch if they are. Before the first
+    successful fetch it returns fallback(), e.g. notices from the database.
+    A fetch that finds no notices counts as a failure, so a page the
+    scraper cannot parse does not hide the fallback behind an empty list.
+    Fetches go through a circuit breaker, so a slow or failing site is left
+    alone for a while instead of being retried on every refresh.
+    """
+
+    def __init__(self, fetch, ttl=300, fallback=None, breaker=None, clock=time.monotonic):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.fallback = fallback
+        self.breaker = breaker or CircuitBreaker()
+        self.clock = clock
+        self.notices = None
+        self.fetched_at = None
+        self.last_error = None
+        self.refreshes = 0
+        self.failures = 0
+        self._pid = None
+        self._thread = None
+        self._wake = None
+        self._stopped = None
+
+    @property
+    def started(self):
+        """True once start() was called, in this process or before a fork."""
+        return self._pid is not None
+
+    def start(self):
+        """Start the refresher thread for this process if it is not running."""
+        # A thread started before a fork does not exist in the child
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        self._pid = os.getpid()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='notice-refresher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._stopped is not None:
+            self._stopped.set()
+            self._wake.set()
+        self._thread = None
+
+    def _run(self):
+        stopped = self._stopped
+        wake = self._wake
+        while not stopped.is_set():
+            self.refresh()
+            wake.wait(self.ttl)
+            wake.clear()
+
+    def _fetch(self):
+        notices = self.fetch()
+        if not notices:
+            raise ValueError("No notices found on the noticeboard page")
+        return notices
+
+    def refresh(self):
+        """Fetch notices now; on failure the previous notices are kept."""
+        try:
+            notices = self.breaker.call(self._fetch)
+        except CircuitOpenError as e:
+            self.last_error = str(e)
+            return False
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            print(f"Error refreshing notices: {e}")
+            return False
+        self.notices = notices
+        self.fetched_at = self.clock()
+        self.last_error = None
+        self.refreshes += 1
+        return True
+
+    def is_stale(self):
+        return self.fetched_at is None or self.clock() - self.fetched_at >= self.ttl
+
+    def get(self):
+        """Return cached notices without blocking on the network."""
+        self.start()
+        notices = self.notices
+        if self.is_stale():
+            # Serve what we have and let the refresher fetch a new copy
+            self._wake.set()
+        if notices is None:
+            if self.fallback is None:
+                return []
+            try:
+                return self.fallback()
+            except Exception as e:
+                print(f"Error loading fallback notices: {e}")
+                return []
+        return notices
+
+    def stats(self):
+        return {
+            'notices': len(self.notices) if self.notices is not None else None,
+            'age_seconds': round(self.clock() - self.fetched_at, 1) if self.fetched_at is not None else None,
+            'stale': self.is_stale(),
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+            'last_error': self.last_error,
+            'circuit': self.breaker.state,
+        }
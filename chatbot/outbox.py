@@ -0,0 +1,298 @@
+import os
+import random
+import smtplib
+import sqlite3
+import threading
+import time
+from email.utils import getaddresses
+
+OUTBOX_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'outbox.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account TEXT,
+    sender TEXT NOT NULL,
+    recipients TEXT NOT NULL,
+    message TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    sent_at REAL
+);
+"""
+
+# Applied after SCHEMA, once an outbox created before the account column has it
+INDEXES = """
+DROP INDEX IF EXISTS ix_email_outbox_due;
+CREATE INDEX IF NOT EXISTS ix_email_outbox_account_due ON email_outbox (account, status, next_attempt_at);
+"""
+
+# Errors after which the connection cannot be used for the rest of a batch
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPAuthenticationError, OSError)
+
+
+class Outbox:
+    """Queue emails in SQLite and send them from a background thread.
+
+    enqueue() only inserts a row, so a request handler returns at once.
+    The sender thread claims due messages in batches of `batch_size` and
+    sends them over one authenticated SMTP connection, which it keeps open
+    between batches until it has been idle for `idle_timeout` seconds. A
+    failed message is retried with exponential backoff (`base_delay`
+    doubling up to `max_delay`, with jitter) and marked failed after
+    `max_attempts`. Rows are claimed for `claim_timeout` seconds, so
+    several processes can share an outbox and a message claimed by a
+    process that died is picked up again. Every row records the SMTP
+    account that queued it, and a sender only claims its own account's
+    rows, so apps with different logins can share one outbox file.
+    """
+
+    def __init__(self, host, port, username=None, password=None, starttls=True, path=OUTBOX_PATH,
+                 batch_size=20, max_attempts=8, base_delay=30, max_delay=3600,
+                 idle_timeout=60, poll_interval=30, claim_timeout=300, timeout=10):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.path = path
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.idle_timeout = idle_timeout
+        self.poll_interval = poll_interval
+        self.claim_timeout = claim_timeout
+        self.timeout = timeout
+        self.account = f"{username or ''}@{host}:{port}"
+        self.last_error = None
+        self._schema_ready = False
+        self._server = None
+        self._last_used = None
+        self._pid = None
+        self._thread = None
+        self._wake = None
+        self._stopped = None
+
+    def _connect_db(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        if not self._schema_ready:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn.executescript(SCHEMA)
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(email_outbox)')]
+            if 'account' not in columns:
+                # Rows queued before then name no account and are never claimed
+                conn.execute('ALTER TABLE email_outbox ADD COLUMN account TEXT')
+            conn.executescript(INDEXES)
+            self._schema_ready = True
+        return conn
+
+    def enqueue(self, msg):
+        """Store an email.message.Message for sending and return its row id."""
+        recipients = [address for _, address in getaddresses(msg.get_all('To', []) + msg.get_all('Cc', []))]
+        now = time.time()
+        conn = self._connect_db()
+        try:
+            cursor = conn.execute(
+                'INSERT INTO email_outbox (account, sender, recipients, message, next_attempt_at, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (self.account, msg['From'], '\n'.join(recipients), msg.as_string(), now, now),
+            )
+            message_id = cursor.lastrowid
+        finally:
+            conn.close()
+        self.start()
+        self._wake.set()
+        return message_id
+
+    @property
+    def started(self):
+        """True once start() was called, in this process or before a fork."""
+        return self._pid is not None
+
+    def start(self):
+        """Start the sender thread for this process if it is not running."""
+        # A thread started before a fork does not exist in the child, and
+        # the parent's SMTP socket must not be used from it
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        self._pid = os.getpid()
+        self._server = None
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='outbox-sender', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._stopped is not None:
+            self._stopped.set()
+            self._wake.set()
+        self._thread = None
+
+    def _run(self):
+        stopped = self._stopped
+        wake = self._wake
+        while not stopped.is_set():
+            try:
+                if self.send_due():
+                    continue
+                wait = self._seconds_until_due()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Error in outbox sender: {e}")
+                wait = self.poll_interval
+            if self._server is not None and time.monotonic() - self._last_used >= self.idle_timeout:
+                self._disconnect()
+            if self._server is not None:
+                wait = min(wait, self.idle_timeout)
+            wake.wait(wait)
+            wake.clear()
+        self._disconnect()
+
+    def _seconds_until_due(self):
+        conn = self._connect_db()
+        try:
+            (next_at,) = conn.execute(
+                "SELECT MIN(next_attempt_at) FROM email_outbox WHERE account = ? AND status IN ('pending', 'sending')",
+                (self.account,),
+            ).fetchone()
+        finally:
+            conn.close()
+        if next_at is None:
+            return self.poll_interval
+        return min(self.poll_interval, max(0.0, next_at - time.time()))
+
+    def _claim(self):
+        now = time.time()
+        conn = self._connect_db()
+        try:
+            # The write lock is taken up front so two senders cannot claim
+            # the same rows
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute(
+                "SELECT id, sender, recipients, message, attempts FROM email_outbox "
+                "WHERE account = ? AND status IN ('pending', 'sending') AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at, id LIMIT ?",
+                (self.account, now, self.batch_size),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE email_outbox SET status = 'sending', next_attempt_at = ? WHERE id = ?",
+                [(now + self.claim_timeout, row[0]) for row in rows],
+            )
+            conn.execute('COMMIT')
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return rows
+
+    def send_due(self):
+        """Send one batch of due messages; return how many were claimed."""
+        rows = self._claim()
+        if not rows:
+            return 0
+
+        sent, retries, unsent = [], [], []
+        now = time.time()
+        for index, (message_id, sender, recipients, message, attempts) in enumerate(rows):
+            try:
+                server = self._connection()
+                server.sendmail(sender, recipients.split('\n'), message.encode('utf-8'))
+                self._last_used = time.monotonic()
+                sent.append((now, message_id))
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Error sending outbox message {message_id}: {e}")
+                retries.append((message_id, attempts + 1, str(e)))
+                if isinstance(e, CONNECTION_ERRORS) or getattr(e, 'smtp_code', None) == 421:
+                    # The server is gone or throttling us: hand the rest of
+                    # the batch back without counting an attempt against it
+                    self._disconnect()
+                    unsent = [(row[0], row[4], None) for row in rows[index + 1:]]
+                    break
+
+        self._finish(sent, retries, unsent)
+        if not retries:
+            self.last_error = None
+        return len(rows)
+
+    def _finish(self, sent, retries, unsent):
+        now = time.time()
+        updates = []
+        for message_id, attempts, error in retries:
+            if attempts >= self.max_attempts:
+                updates.append(('failed', attempts, now, error, message_id))
+            else:
+                updates.append(('pending', attempts, now + self._backoff(attempts), error, message_id))
+        delay = self._backoff(max([attempts for _, attempts, _ in retries], default=1))
+        for message_id, attempts, _ in unsent:
+            updates.append(('pending', attempts, now + delay, None, message_id))
+
+        conn = self._connect_db()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany(
+                "UPDATE email_outbox SET status = 'sent', sent_at = ?, attempts = attempts + 1, last_error = NULL "
+                "WHERE id = ?",
+                sent,
+            )
+            conn.executemany(
+                'UPDATE email_outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?',
+                updates,
+            )
+            conn.execute('COMMIT')
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _backoff(self, attempts):
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _connection(self):
+        if self._server is None:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            try:
+                server.ehlo()
+                if self.starttls:
+                    server.starttls()
+                    server.ehlo()
+                if self.username:
+                    server.login(self.username, self.password)
+            except Exception:
+                server.close()
+                raise
+            self._server = server
+            self._last_used = time.monotonic()
+        return self._server
+
+    def _disconnect(self):
+        server, self._server = self._server, None
+        if server is None:
+            return
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def stats(self):
+        conn = self._connect_db()
+        try:
+            counts = dict(conn.execute(
+                'SELECT status, COUNT(*) FROM email_outbox WHERE account = ? GROUP BY status', (self.account,)
+            ).fetchall())
+        finally:
+            conn.close()
+        return {
+            'pending': counts.get('pending', 0) + counts.get('sending', 0),
+            'sent': counts.get('sent', 0),
+            'failed': counts.get('failed', 0),
+            'connected': self._server is not None,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,165 @@
+import logging
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+logger = logging.getLogger('chatbot')
+
+# Latency bucket upper bounds in milliseconds; the last bucket is open ended
+DEFAULT_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram, safe to update from several threads."""
+
+    def __init__(self, buckets_ms=DEFAULT_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        ms = seconds * 1000.0
+        index = bisect_left(self.buckets_ms, ms)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total_ms += ms
+            if ms > self.max_ms:
+                self.max_ms = ms
+
+    def quantile(self, q):
+        """Approximate quantile in ms: the upper bound of the bucket holding it."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.buckets_ms[i] if i < len(self.buckets_ms) else self.max_ms
+        return self.max_ms
+
+    def export(self):
+        with self._lock:
+            bounds = [str(bound) for bound in self.buckets_ms] + ['+Inf']
+            return {
+                'count': self.count,
+                'sum_ms': round(self.total_ms, 3),
+                'max_ms': round(self.max_ms, 3),
+                'p50_ms': self.quantile(0.50),
+                'p95_ms': self.quantile(0.95),
+                'p99_ms': self.quantile(0.99),
+                'buckets': dict(zip(bounds, self.counts)),
+            }
+
+
+class _StageTimer:
+    __slots__ = ('trace', 'name', 'start')
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.trace.stages.append((self.name, perf_counter() - self.start))
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Trace:
+    """Stage timings for one message, filled in with `with trace.stage(name):`."""
+
+    __slots__ = ('stages', 'start')
+
+    def __init__(self):
+        self.stages = []
+        self.start = perf_counter()
+
+    def stage(self, name):
+        return _StageTimer(self, name)
+
+    def elapsed(self):
+        return perf_counter() - self.start
+
+
+class NullTrace:
+    """Trace that records nothing, for callers outside the request path."""
+
+    __slots__ = ()
+
+    def stage(self, name):
+        return _NULL_TIMER
+
+
+NULL_TRACE = NullTrace()
+
+
+class PipelineMetrics:
+    """In-process histograms of per-stage and end-to-end chatbot latency.
+
+    Each finished trace adds its stage timings to one histogram per stage
+    and its total time to one histogram per answering route. Per-message
+    detail is only logged when the 'chatbot' logger is at DEBUG level.
+    """
+
+    def __init__(self, buckets_ms=DEFAULT_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self.stages = {}
+        self.routes = {}
+        self._lock = threading.Lock()
+
+    def _histogram(self, table, name):
+        histogram = table.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = table.setdefault(name, Histogram(self.buckets_ms))
+        return histogram
+
+    def record(self, trace, route, seconds=None):
+        if seconds is None:
+            seconds = trace.elapsed()
+        for name, stage_seconds in trace.stages:
+            self._histogram(self.stages, name).observe(stage_seconds)
+        self._histogram(self.routes, route).observe(seconds)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "answered_by=%s total_ms=%.3f stages=%s", route, seconds * 1000.0,
+                ' '.join(f"{name}:{stage_seconds * 1000.0:.3f}" for name, stage_seconds in trace.stages),
+            )
+
+    def observe_stage(self, name, seconds):
+        self._histogram(self.stages, name).observe(seconds)
+
+    def export(self):
+        """Return {'answered_by': {route: histogram}, 'stages': {stage: histogram}}."""
+        with self._lock:
+            routes = dict(self.routes)
+            stages = dict(self.stages)
+        return {
+            'answered_by': {name: histogram.export() for name, histogram in sorted(routes.items())},
+            'stages': {name: histogram.export() for name, histogram in sorted(stages.items())},
+        }
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.routes = {}
@@ -0,0 +1,38 @@
+# Gunicorn settings, used by the Procfile: gunicorn -c gunicorn.conf.py app:app
+import os
+
+# CHATBOT_PRELOAD=1 imports the app and builds the chatbot knowledge base
+# once in the master; workers are forked from it and share that memory
+# copy-on-write instead of each building their own copy. Background jobs
+# (the scheduler, notice refresher and reload watcher) are started in each
+# worker by post_fork, never in the master.
+preload_app = os.environ.get('CHATBOT_PRELOAD') == '1'
+
+
+def when_ready(server):
+    if preload_app:
+        from chatbot.chatbot import share_knowledge_base
+        share_knowledge_base()
+
+
+def post_fork(server, worker):
+    # Build the chatbot engine before this worker accepts requests, so
+    # /healthz reports ready only once the first chat will be fast.
+    # With preload_app it is already built and this returns at once.
+    from chatbot.chatbot import restart_after_fork, warmup
+    warmup()
+    restart_after_fork()
+
+    if preload_app:
+        # Database connections opened by the master must not be shared
+        from app import db
+        db.engine.dispose(close=False)
+
+    from app import start_background_jobs
+    start_background_jobs()
+
+
+def worker_exit(server, worker):
+    # Write chat turns still buffered in this worker before it exits
+    from app import chat_history_buffer
+    chat_history_buffer.close()
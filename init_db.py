@@ -1,5 +1,5 @@
-from app import app, db
-
-with app.app_context():
-    db.create_all()
-    print("Database initialized successfully!") 
\ No newline at end of file
+from app import app, create_tables
+
+with app.app_context():
+    create_tables()
+    print("Database initialized successfully!")
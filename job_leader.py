@@ -0,0 +1,239 @@
+import atexit
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from functools import wraps
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scheduler_lease (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    acquired_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scheduled_job (
+    name TEXT PRIMARY KEY,
+    runs INTEGER NOT NULL DEFAULT 0,
+    failures INTEGER NOT NULL DEFAULT 0,
+    last_holder TEXT,
+    last_started_at REAL,
+    last_finished_at REAL,
+    last_success_at REAL,
+    last_duration_seconds REAL,
+    last_error TEXT
+);
+"""
+
+
+class JobLeader:
+    """Elect one process to run scheduled jobs, using a lease row in SQLite.
+
+    Every process that imports the app starts a scheduler, but jobs wrapped
+    with wrap() only run in the process holding the lease. The holder
+    renews it every `ttl / 3` seconds; if the holder dies, another process
+    takes over once `ttl` has passed without a renewal (at once if it
+    exits cleanly and releases it). Lease and job rows live in the shared
+    database, so there is one leader per database, whatever the number of
+    workers. Each run's duration, outcome and time of the last success are
+    recorded in the scheduled_job table.
+    """
+
+    def __init__(self, db_path, name='scheduler', ttl=60, clock=time.time):
+        self.db_path = db_path
+        self.name = name
+        self.ttl = ttl
+        self.renew_interval = ttl / 3
+        self.clock = clock
+        self.holder = None
+        self.expires_at = 0.0
+        self._pid = None
+        self._thread = None
+        self._stopped = None
+        self._schema_ready = False
+        self._lock = threading.Lock()
+        atexit.register(self.stop)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        if not self._schema_ready:
+            conn.executescript(SCHEMA)
+            self._schema_ready = True
+        return conn
+
+    def is_leader(self):
+        return self._pid == os.getpid() and self.clock() < self.expires_at
+
+    def start(self):
+        """Start competing for the lease in this process if not already."""
+        # A thread started before a fork does not exist in the child, and
+        # the child must not reuse the parent's holder id
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        self._pid = os.getpid()
+        self.holder = f"{socket.gethostname()}:{self._pid}:{uuid.uuid4().hex[:8]}"
+        self.expires_at = 0.0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='job-leader', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop renewing and hand the lease over if this process holds it."""
+        if self._stopped is not None:
+            self._stopped.set()
+        self._thread = None
+        if self.is_leader():
+            self.release()
+
+    def _run(self):
+        stopped = self._stopped
+        while not stopped.is_set():
+            self.acquire()
+            stopped.wait(self.renew_interval)
+
+    def acquire(self):
+        """Take or renew the lease; return True if this process holds it."""
+        with self._lock:
+            return self._acquire()
+
+    def _acquire(self):
+        was_leader = self.is_leader()
+        now = self.clock()
+        try:
+            conn = self._connect()
+        except sqlite3.Error as e:
+            print(f"Error acquiring scheduler lease: {e}")
+            return was_leader
+        try:
+            # BEGIN IMMEDIATE takes the write lock up front, so two
+            # processes cannot both see an expired lease and claim it
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT holder, expires_at FROM scheduler_lease WHERE name = ?', (self.name,)
+            ).fetchone()
+            held = row is None or row[0] == self.holder or row[1] <= now
+            if held:
+                conn.execute("""
+                    INSERT INTO scheduler_lease (name, holder, acquired_at, expires_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (name) DO UPDATE SET
+                        acquired_at = CASE WHEN holder = excluded.holder
+                                           THEN acquired_at ELSE excluded.acquired_at END,
+                        holder = excluded.holder,
+                        expires_at = excluded.expires_at
+                """, (self.name, self.holder, now, now + self.ttl))
+            conn.execute('COMMIT')
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"Error acquiring scheduler lease: {e}")
+            # Keep what we had until it expires; another process cannot
+            # take the lease before then either
+            return was_leader
+        finally:
+            conn.close()
+
+        self.expires_at = now + self.ttl if held else 0.0
+        if held and not was_leader:
+            print(f"Scheduler lease '{self.name}' acquired by {self.holder}")
+        elif was_leader and not held:
+            print(f"Scheduler lease '{self.name}' lost by {self.holder}")
+        return held
+
+    def release(self):
+        self.expires_at = 0.0
+        try:
+            conn = self._connect()
+            try:
+                conn.execute('DELETE FROM scheduler_lease WHERE name = ? AND holder = ?', (self.name, self.holder))
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"Error releasing scheduler lease: {e}")
+
+    def wrap(self, func, name=None, record=True):
+        """Return a job function that only runs, and is recorded, on the leader.
+
+        With record=False it still only runs on the leader, but writes no
+        scheduled_job row and prints nothing unless it fails; for frequent
+        housekeeping whose every run is not worth a database write.
+        """
+        job_name = name or func.__name__
+
+        @wraps(func)
+        def job(*args, **kwargs):
+            self.start()
+            # Renew right before running, so a process whose lease has
+            # quietly expired cannot run alongside the new leader
+            if not self.acquire():
+                return None
+            if not record:
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    print(f"Scheduled job {job_name} failed: {e}")
+                    return None
+            started_at = self.clock()
+            start = time.perf_counter()
+            self._record(job_name, started_at=started_at)
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                duration = time.perf_counter() - start
+                self._record(job_name, finished_at=self.clock(), duration=duration, error=str(e) or type(e).__name__)
+                print(f"Scheduled job {job_name} failed after {duration:.1f}s: {e}")
+                return None
+            duration = time.perf_counter() - start
+            self._record(job_name, finished_at=self.clock(), duration=duration)
+            print(f"Scheduled job {job_name} finished in {duration:.1f}s")
+            return result
+
+        return job
+
+    def _record(self, job_name, started_at=None, finished_at=None, duration=None, error=None):
+        try:
+            conn = self._connect()
+        except sqlite3.Error as e:
+            print(f"Error recording scheduled job {job_name}: {e}")
+            return
+        try:
+            if started_at is not None:
+                conn.execute("""
+                    INSERT INTO scheduled_job (name, runs, last_holder, last_started_at)
+                    VALUES (?, 1, ?, ?)
+                    ON CONFLICT (name) DO UPDATE SET
+                        runs = runs + 1,
+                        last_holder = excluded.last_holder,
+                        last_started_at = excluded.last_started_at
+                """, (job_name, self.holder, started_at))
+            else:
+                conn.execute("""
+                    UPDATE scheduled_job SET
+                        last_finished_at = ?,
+                        last_duration_seconds = ?,
+                        last_error = ?,
+                        failures = failures + ?,
+                        last_success_at = CASE WHEN ? IS NULL THEN ? ELSE last_success_at END
+                    WHERE name = ?
+                """, (finished_at, duration, error, int(error is not None), error, finished_at, job_name))
+        except sqlite3.Error as e:
+            print(f"Error recording scheduled job {job_name}: {e}")
+        finally:
+            conn.close()
+
+    def status(self):
+        """Current lease holder and the recorded state of every job."""
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        try:
+            lease = conn.execute('SELECT * FROM scheduler_lease WHERE name = ?', (self.name,)).fetchone()
+            jobs = conn.execute('SELECT * FROM scheduled_job ORDER BY name').fetchall()
+        finally:
+            conn.close()
+        return {
+            'holder': self.holder,
+            'is_leader': self.is_leader(),
+            'lease': dict(lease) if lease is not None else None,
+            'jobs': [dict(job) for job in jobs],
+        }
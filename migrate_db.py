@@ -1,10 +1,12 @@
-from app import db, app
+from app import db, app, normalize_notice_title, DATABASE_PATH
+from search_index import SEARCH_TABLES, install_search_index, rebuild_search_index
 import sqlite3
+import sys
 
-def migrate_database():
+def migrate_database(rebuild_search=False):
     with app.app_context():
         # Connect to the database
-        conn = sqlite3.connect('student_portal.db')
+        conn = sqlite3.connect(DATABASE_PATH)
         cursor = conn.cursor()
         
         try:
@@ -19,24 +21,77 @@ def migrate_database():
             else:
                 print("profile_photo column already exists")
             
-            # Drop notice table if it exists
-            cursor.execute("DROP TABLE IF EXISTS notice")
-            print("Dropped existing notice table")
-            
-            # Create notice table with correct schema
-            cursor.execute("""
-                CREATE TABLE notice (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title VARCHAR(500) NOT NULL,
-                    date_posted DATETIME NOT NULL,
-                    link VARCHAR(500) NOT NULL,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            print("Created notice table with correct schema")
+            # Create the notice table, or give an existing one its title_key column
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='notice'")
+            if cursor.fetchone() is None:
+                cursor.execute("""
+                    CREATE TABLE notice (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        title VARCHAR(500) NOT NULL,
+                        title_key VARCHAR(500) NOT NULL,
+                        date_posted DATETIME NOT NULL,
+                        link VARCHAR(500) NOT NULL,
+                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+                print("Created notice table with correct schema")
+            else:
+                cursor.execute("PRAGMA table_info(notice)")
+                notice_columns = [column[1] for column in cursor.fetchall()]
+                if 'title_key' not in notice_columns:
+                    cursor.execute("ALTER TABLE notice ADD COLUMN title_key VARCHAR(500)")
+                    # Fill in the keys, keeping the oldest row of any duplicates
+                    cursor.execute("SELECT id, title FROM notice ORDER BY id")
+                    keys = {}
+                    duplicates = []
+                    for notice_id, title in cursor.fetchall():
+                        key = normalize_notice_title(title)
+                        if key in keys:
+                            duplicates.append((notice_id,))
+                        else:
+                            keys[key] = notice_id
+                    cursor.executemany("UPDATE notice SET title_key = ? WHERE id = ?",
+                                       [(key, notice_id) for key, notice_id in keys.items()])
+                    cursor.executemany("DELETE FROM notice WHERE id = ?", duplicates)
+                    print(f"Added title_key column to notice table ({len(duplicates)} duplicate notices removed)")
+                else:
+                    print("title_key column already exists")
             
+            cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS ix_notice_title_key ON notice (title_key)")
+
+            # Folder columns of support tickets; the folder indexes and the
+            # counters compare them with 0, so old rows get 0 rather than NULL
+            cursor.execute("PRAGMA table_info(support_ticket)")
+            ticket_columns = [column[1] for column in cursor.fetchall()]
+            for name, ddl in (('deleted', 'BOOLEAN NOT NULL DEFAULT 0'),
+                              ('deleted_at', 'DATETIME'),
+                              ('archived', 'BOOLEAN NOT NULL DEFAULT 0'),
+                              ('archived_at', 'DATETIME'),
+                              ('starred', 'BOOLEAN NOT NULL DEFAULT 0')):
+                if ticket_columns and name not in ticket_columns:
+                    cursor.execute(f"ALTER TABLE support_ticket ADD COLUMN {name} {ddl}")
+                    print(f"Added {name} column to support_ticket table")
+
             # Commit the changes
             conn.commit()
+            
+            # New tables, then indexes declared on the models; create_all()
+            # only adds indexes along with the tables it creates
+            db.create_all()
+            for table in db.metadata.sorted_tables:
+                for index in sorted(table.indexes, key=lambda index: index.name):
+                    index.create(bind=db.engine, checkfirst=True)
+            print("Model indexes are in place")
+
+            # Full-text search tables and their triggers; a new one is filled
+            # from the rows already in its table
+            created = install_search_index(conn)
+            rebuild = list(SEARCH_TABLES) if rebuild_search else created
+            if rebuild:
+                rebuild_search_index(conn, rebuild)
+                print(f"Built search index for {', '.join(rebuild)}")
+            else:
+                print("Search index is in place")
             print("Migration completed successfully")
             
         except Exception as e:
@@ -46,4 +101,5 @@ def migrate_database():
             conn.close()
 
 if __name__ == '__main__':
-    migrate_database() 
\ No newline at end of file
+    # --rebuild-search-index re-indexes every table, e.g. after a restore
+    migrate_database(rebuild_search='--rebuild-search-index' in sys.argv) 
\ No newline at end of file
@@ -0,0 +1,176 @@
+import hashlib
+import importlib.util
+import json
+import os
+import threading
+from itertools import islice
+
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
+
+NOTICEBOARD_URL = 'https://ptu.ac.in/noticeboard-main/'
+FETCH_TIMEOUT = 10
+
+
+def normalize_notice_title(title):
+    """Key that identifies a notice: case and whitespace differences are ignored."""
+    return ' '.join(title.split()).casefold()
+
+
+def make_session(pool_size=4):
+    """requests.Session with a small keep-alive pool, shared by every fetch."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['User-Agent'] = 'ptu-student-support/1.0'
+    return session
+
+
+class NoticeboardPage:
+    """A downloaded noticeboard page and the validators it was served with."""
+
+    def __init__(self, html, content_hash, etag=None, last_modified=None):
+        self.html = html
+        self.content_hash = content_hash
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class NoticeboardFetcher:
+    """Download the noticeboard only when it has changed.
+
+    Requests carry the ETag and Last-Modified validators of the last page
+    that was processed, so an unchanged page costs a 304 with no body. If
+    the server ignores them, a SHA-256 of the body catches an identical
+    page before it is parsed. Validators are only remembered once the
+    caller has saved a page (remember()), so a failed run is retried.
+    With `state_path` they are kept in a JSON file between runs.
+    """
+
+    def __init__(self, url=NOTICEBOARD_URL, timeout=FETCH_TIMEOUT, session=None, state_path=None):
+        self.url = url
+        self.timeout = timeout
+        self.session = session or make_session()
+        self.state_path = state_path
+        self.etag = None
+        self.last_modified = None
+        self.content_hash = None
+        self._lock = threading.Lock()
+        self._load_state()
+
+    def _load_state(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring noticeboard state file: {e}")
+            return
+        if state.get('url') == self.url:
+            self.etag = state.get('etag')
+            self.last_modified = state.get('last_modified')
+            self.content_hash = state.get('content_hash')
+
+    def _save_state(self):
+        if not self.state_path:
+            return
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'url': self.url,
+                'etag': self.etag,
+                'last_modified': self.last_modified,
+                'content_hash': self.content_hash,
+            }, f)
+        os.replace(tmp_path, self.state_path)
+
+    def fetch(self):
+        """Return a NoticeboardPage, or None when the page has not changed."""
+        with self._lock:
+            headers = {}
+            if self.etag:
+                headers['If-None-Match'] = self.etag
+            if self.last_modified:
+                headers['If-Modified-Since'] = self.last_modified
+            content_hash = self.content_hash
+
+        response = self.session.get(self.url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+
+        digest = hashlib.sha256(response.content).hexdigest()
+        if digest == content_hash:
+            return None
+        return NoticeboardPage(
+            html=response.text,
+            content_hash=digest,
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+        )
+
+    def remember(self, page):
+        """Record a processed page so the next fetch can skip it if unchanged."""
+        with self._lock:
+            self.etag = page.etag
+            self.last_modified = page.last_modified
+            self.content_hash = page.content_hash
+            self._save_state()
+
+    def forget(self):
+        """Drop the validators so the next fetch downloads and parses the page."""
+        with self._lock:
+            self.etag = None
+            self.last_modified = None
+            self.content_hash = None
+            self._save_state()
+
+
+# lxml builds the tree in C, an order of magnitude faster than
+# BeautifulSoup; when it is not installed html.parser is used
+HTML_PARSER = 'lxml' if importlib.util.find_spec('lxml') else 'html.parser'
+
+
+def _iter_rows_lxml(html):
+    import lxml.html
+
+    if not html.strip():
+        return
+    document = lxml.html.fromstring(html.encode('utf-8'), parser=lxml.html.HTMLParser(encoding='utf-8'))
+    notice_table = next(document.iter('table'), None)
+    if notice_table is None:
+        print("No notice table found")
+        return
+    for row in islice(notice_table.iter('tr'), 1, None):  # Skip header row
+        cols = list(islice(row.iter('td'), 3))
+        if len(cols) >= 3:
+            anchor = next(cols[2].iter('a'), None)
+            yield cols[0].text_content().strip(), cols[1].text_content().strip(), anchor.attrib['href'] if anchor is not None else None
+
+
+def iter_notice_rows(html, parser=None):
+    """Yield (title, date_str, link) for each row of the noticeboard table.
+
+    With lxml the page is parsed natively. Otherwise only <table> elements
+    are built into a BeautifulSoup tree (a SoupStrainer), not the menus,
+    scripts and footer around them. Rows are yielded one at a time so the
+    caller can store them as they come.
+    """
+    parser = parser or HTML_PARSER
+    if parser == 'lxml':
+        yield from _iter_rows_lxml(html)
+        return
+
+    soup = BeautifulSoup(html, parser, parse_only=SoupStrainer('table'))
+    notice_table = soup.find('table')
+    if not notice_table:
+        print("No notice table found")
+        return
+    for row in islice(notice_table.find_all('tr'), 1, None):  # Skip header row
+        cols = row.find_all('td', limit=3)
+        if len(cols) >= 3:
+            anchor = cols[2].find('a')
+            yield cols[0].get_text().strip(), cols[1].get_text().strip(), anchor['href'] if anchor else None
@@ -1,4 +1,4 @@
-from app import app, db, User, Admin
+from app import app, db, User, Admin, create_tables, start_background_jobs, warmup
 from werkzeug.security import generate_password_hash
 # from scheduler import start_scheduler
 
@@ -7,7 +7,8 @@ if __name__ == '__main__':
     with app.app_context():
         # Drop all tables and recreate them
         db.drop_all()
-        db.create_all()
+        # The search tables outlive drop_all(), so re-index them too
+        create_tables(rebuild_search=True)
         print("Database tables recreated successfully")
         
         # Create admin user if it doesn't exist
@@ -39,4 +40,6 @@ if __name__ == '__main__':
                 db.session.rollback()
                 print(f"Error creating users: {e}")
     
+    start_background_jobs()
+    warmup()
     app.run(debug=True) 
\ No newline at end of file
@@ -2,6 +2,7 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 import os
+from sqlite_profile import ENGINE_OPTIONS, apply_sqlite_profile
 
 db = SQLAlchemy()
 login_manager = LoginManager()
@@ -11,8 +12,12 @@ def create_app():
     app.config['SECRET_KEY'] = 'your-secret-key'
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///student_portal.db'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(ENGINE_OPTIONS)
 
     db.init_app(app)
+    # WAL, busy timeout and cache settings on every pooled connection
+    with app.app_context():
+        apply_sqlite_profile(db.engine)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
 
@@ -8,12 +8,19 @@ import os
 import re
 import json
 from datetime import datetime
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import logging
+import sys
 from werkzeug.utils import secure_filename
 
+if not __package__:
+    # Run as `python student_portal/chatbot.py`, sys.path starts with this
+    # directory, where this file's own name hides the chatbot package; start
+    # it with the project root instead, as `python app.py` does
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+from chatbot.outbox import Outbox
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -49,6 +56,7 @@ EMAIL_PORT = 587
 EMAIL_USER = 'vkviki0786@gmail.com'
 EMAIL_PASS = 'odsj fedp tznu inhx'
 ADMIN_EMAILS = ['miss.vanshika.sharma.10@gmail.com', 'vkviki0786@gmail.com']
+outbox = Outbox(EMAIL_HOST, EMAIL_PORT, EMAIL_USER, EMAIL_PASS)
 
 class Chatbot:
     def __init__(self):
@@ -262,30 +270,15 @@ def live_support():
             
             msg.attach(MIMEText(body, 'plain'))
             
-            # Log SMTP connection attempt
-            logger.info("Attempting to connect to SMTP server...")
-            
-            # Send email
-            with smtplib.SMTP(EMAIL_HOST, EMAIL_PORT) as server:
-                server.starttls()
-                logger.info("SMTP TLS started, attempting login...")
-                server.login(EMAIL_USER, EMAIL_PASS)
-                logger.info("SMTP login successful, sending email...")
-                server.send_message(msg)
-                logger.info(f"Email sent successfully to {', '.join(ADMIN_EMAILS)}")
+            # Queue the email; the outbox thread sends it over a shared SMTP connection
+            message_id = outbox.enqueue(msg)
+            logger.info(f"Support email {message_id} queued for {', '.join(ADMIN_EMAILS)}")
                 
             return jsonify({
                 'success': True,
                 'message': 'आपका संदेश सफलतापूर्वक भेज दिया गया है! हम जल्द ही आपसे संपर्क करेंगे।'
             })
             
-        except smtplib.SMTPAuthenticationError as e:
-            logger.error(f"SMTP Authentication failed: {str(e)}")
-            return jsonify({
-                'success': False,
-                'message': 'ईमेल सर्वर प्रमाणीकरण विफल हुआ। कृपया कुछ देर बाद पुनः प्रयास करें।'
-            })
-            
         except Exception as e:
             logger.error(f"Email sending error: {str(e)}")
             return jsonify({
@@ -301,6 +294,8 @@ def live_support():
         })
 
 if __name__ == '__main__':
+    # Send anything left in the outbox by a previous run
+    outbox.start()
     print("\nStarting chatbot server...")
     print("Access the chatbot at http://localhost:5000")
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,60 @@
+import contextlib
+import io
+import os
+
+import pytest
+
+
+@pytest.fixture(scope='session')
+def portal(tmp_path_factory):
+    """The app module, imported against a scratch database."""
+    os.environ['STUDENT_PORTAL_DB'] = str(tmp_path_factory.mktemp('portal') / 'portal.db')
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+    yield app
+    app.job_leader.stop()
+    os.environ.pop('STUDENT_PORTAL_DB', None)
+
+
+@pytest.fixture(scope='session')
+def portal_user(portal):
+    """Id of a student in the scratch database."""
+    with portal.app.app_context():
+        user = portal.User(username='student', email='student@example.com', password='x', full_name='Test Student',
+                           course='btech', semester='1', enrollment_number='TEST-1')
+        portal.db.session.add(user)
+        portal.db.session.commit()
+        return user.id
+
+
+@pytest.fixture
+def client(portal, portal_user):
+    """A test client signed in as portal_user."""
+    client = portal.app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(portal_user)
+        session['_fresh'] = True
+    return client
+
+
+@pytest.fixture(scope='session')
+def portal_admin(portal, portal_user):
+    """(username, password) of an admin whose id is the same as portal_user's."""
+    from werkzeug.security import generate_password_hash
+
+    with portal.app.app_context():
+        admin = portal.Admin(id=portal_user, username='admin', email='admin@example.com',
+                             password=generate_password_hash('admin-password'))
+        portal.db.session.add(admin)
+        portal.db.session.commit()
+    return 'admin', 'admin-password'
+
+
+@pytest.fixture
+def admin_client(portal, portal_admin):
+    """A test client signed in through the admin login form."""
+    client = portal.app.test_client()
+    username, password = portal_admin
+    response = client.post('/admin/login', data={'username': username, 'password': password})
+    assert response.status_code == 302
+    return client
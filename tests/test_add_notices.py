@@ -0,0 +1,81 @@
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from add_notices import add_notices_to_db
+from noticeboard import NoticeboardFetcher
+
+NOTICE_TABLE = b"""<html><body><table>
+<tr><th>Title</th><th>Date</th><th>Link</th></tr>
+<tr><td>Date sheet for May exams</td><td>01/05/2024</td><td><a href="/notice/1.pdf">View</a></td></tr>
+</table></body></html>"""
+
+
+@pytest.fixture
+def noticeboard():
+    """A local stand-in for the PTU noticeboard; set .status and .page to change the response."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(self.server.status)
+            self.send_header('Content-Type', 'text/html')
+            self.end_headers()
+            self.wfile.write(self.server.page)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.status = 200
+    server.page = NOTICE_TABLE
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def notice_db(tmp_path):
+    path = str(tmp_path / 'notices.db')
+    conn = sqlite3.connect(path)
+    conn.execute("""CREATE TABLE notice (id INTEGER PRIMARY KEY, title TEXT, title_key TEXT UNIQUE,
+                    date_posted DATETIME, link TEXT, created_at DATETIME)""")
+    conn.execute("INSERT INTO notice (title, title_key, link) VALUES ('Stored notice', 'stored notice', '#')")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def stored_titles(path):
+    conn = sqlite3.connect(path)
+    try:
+        return [row[0] for row in conn.execute('SELECT title FROM notice ORDER BY id')]
+    finally:
+        conn.close()
+
+
+def fetcher_for(server):
+    return NoticeboardFetcher(url=f'http://127.0.0.1:{server.server_port}/noticeboard-main/')
+
+
+def test_unchanged_page_is_reported_as_no_changes(noticeboard, notice_db, capsys):
+    fetcher = fetcher_for(noticeboard)
+    assert add_notices_to_db(notice_db, fetcher) is True
+    assert stored_titles(notice_db) == ['Date sheet for May exams']
+
+    assert add_notices_to_db(notice_db, fetcher) is True
+    assert 'No changes on the noticeboard' in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('status, page', [(500, b'Internal Server Error'), (200, b'<html><p>Maintenance</p></html>')])
+def test_failed_fetch_is_an_error_not_no_changes(noticeboard, notice_db, capsys, status, page):
+    noticeboard.status = status
+    noticeboard.page = page
+
+    assert add_notices_to_db(notice_db, fetcher_for(noticeboard)) is False
+    out = capsys.readouterr().out
+    assert 'Error fetching notices' in out
+    assert 'No changes' not in out
+    assert stored_titles(notice_db) == ['Stored notice']
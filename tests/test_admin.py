@@ -0,0 +1,60 @@
+import pytest
+
+ADMIN_PAGES = [
+    ('get', '/admin/chatbot_metrics'),
+    ('get', '/admin/scheduler_status'),
+    ('get', '/admin/storage_status'),
+    ('get', '/admin/search?q=fee'),
+    ('post', '/admin/reload_knowledge_base'),
+]
+
+
+@pytest.fixture(autouse=True)
+def no_reload(portal, monkeypatch):
+    reloads = []
+    monkeypatch.setattr(portal, 'request_knowledge_base_reload', lambda: reloads.append(True))
+    return reloads
+
+
+@pytest.mark.parametrize('method, page', ADMIN_PAGES)
+def test_admin_pages_open_to_a_signed_in_admin(admin_client, method, page):
+    response = getattr(admin_client, method)(page)
+    assert response.status_code in (200, 202)
+
+
+@pytest.mark.parametrize('method, page', ADMIN_PAGES)
+def test_admin_pages_closed_to_students(client, method, page):
+    assert getattr(client, method)(page).status_code == 403
+
+
+def test_reload_is_started_by_an_admin(admin_client, no_reload):
+    response = admin_client.post('/admin/reload_knowledge_base')
+    assert response.status_code == 202
+    assert no_reload == [True]
+
+
+def test_admin_does_not_load_as_the_student_with_the_same_id(portal, admin_client):
+    # The admin's id is the student's, but student pages stay closed to it
+    assert admin_client.get('/get_chat_history').status_code == 403
+
+
+def test_wrong_admin_password_is_refused(portal, portal_admin):
+    client = portal.app.test_client()
+    response = client.post('/admin/login', data={'username': portal_admin[0], 'password': 'wrong'})
+    assert response.status_code != 302
+    assert client.get('/admin/chatbot_metrics').status_code in (302, 401)
+
+
+def test_scheduler_status_shows_the_leader_and_its_jobs(portal, admin_client):
+    job = portal.job_leader.wrap(lambda: 'done', name='status_check')
+    housekeeping = portal.job_leader.wrap(lambda: 'checked', name='unrecorded_check', record=False)
+    try:
+        assert job() == 'done'
+        assert housekeeping() == 'checked'
+        status = admin_client.get('/admin/scheduler_status').get_json()
+    finally:
+        portal.job_leader.stop()
+    assert status['is_leader'] and status['lease']['holder'] == status['holder']
+    recorded = {row['name']: row for row in status['jobs']}
+    assert recorded['status_check']['runs'] == 1 and recorded['status_check']['last_error'] is None
+    assert 'unrecorded_check' not in recorded
@@ -0,0 +1,18 @@
+import threading
+
+import chatbot.chatbot as bot
+
+
+def test_import_starts_no_background_jobs(portal):
+    assert not portal.scheduler.running
+    assert portal.job_leader._thread is None
+    assert not portal.notice_cache.started
+
+
+def test_healthz_is_ready_after_a_lazy_load(portal, monkeypatch):
+    monkeypatch.setattr(bot, '_ready', threading.Event())
+    monkeypatch.setattr(bot, 'knowledge_base', None)
+    client = portal.app.test_client()
+    assert client.get('/healthz').status_code == 503
+    bot.get_knowledge_base()
+    assert client.get('/healthz').status_code == 200
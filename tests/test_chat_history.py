@@ -0,0 +1,106 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+import pytest
+
+TEMPLATE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates', 'chat.html')
+TURNS = 120
+# Characters encodeURIComponent() leaves alone, besides letters and digits
+SAFE = "-_.!~*'()"
+
+# Just enough DOM for loadChatHistory(); prints the history messages shown
+HARNESS = """
+class Element {
+    constructor() { this.children = []; this.handlers = {}; this.id = ''; this._html = ''; }
+    set innerHTML(html) { this._html = html; if (html === '') this.children = []; }
+    get innerHTML() { return this._html; }
+    appendChild(child) { child.parent = this; this.children.push(child); return child; }
+    remove() { this.parent.children = this.parent.children.filter(child => child !== this); }
+    addEventListener(type, handler) { this.handlers[type] = handler; }
+}
+const historyList = new Element();
+const chatMessages = new Element();
+global.document = {
+    createElement: () => new Element(),
+    getElementById: id => ({'chat-history-list': historyList, 'chat-messages': chatMessages})[id]
+        || historyList.children.find(child => child.id === id) || null,
+};
+const pages = %(pages)s;
+global.fetch = url => Promise.resolve({json: () => Promise.resolve(pages[url])});
+const formatDate = date => date;
+const settle = () => new Promise(resolve => setTimeout(resolve, 0));
+%(code)s
+(async () => {
+    loadChatHistory();
+    await settle();
+    for (let button; (button = document.getElementById('load-older-btn')); ) {
+        button.handlers.click();
+        await settle();
+    }
+    const items = historyList.children.filter(child => child.className === 'chat-history-item');
+    console.log(JSON.stringify(items.map(item => item.innerHTML.match(/history-message">(.*)</)[1])));
+})();
+"""
+
+
+@pytest.fixture(scope='module')
+def history_user(portal):
+    """A student with TURNS chat turns, one every six hours."""
+    with portal.app.app_context():
+        user = portal.User(username='history', email='history@example.com', password='x', full_name='History',
+                           course='btech', semester='2', enrollment_number='TEST-HISTORY')
+        portal.db.session.add(user)
+        portal.db.session.commit()
+        user_id = user.id
+    start = datetime(2024, 1, 1)
+    portal.insert_chat_history([
+        {'user_id': user_id, 'message': f'turn {i}', 'response': 'Answer', 'timestamp': start + timedelta(hours=6 * i)}
+        for i in range(TURNS)
+    ])
+    return user_id
+
+
+@pytest.fixture
+def history_client(portal, history_user):
+    client = portal.app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(history_user)
+        session['_fresh'] = True
+    return client
+
+
+def history_pages(client):
+    """Every page the chat page can request, keyed by URL, following next_cursor."""
+    pages = {}
+    url = '/get_chat_history'
+    while url:
+        page = client.get(url).get_json()
+        pages[url] = page
+        # Encoded as the page's encodeURIComponent() does
+        url = page['next_cursor'] and f"/get_chat_history?before={quote(page['next_cursor'], safe=SAFE)}"
+    return pages
+
+
+def test_cursor_pages_reach_the_oldest_turn(history_client):
+    pages = history_pages(history_client)
+    assert len(pages) > 1
+    messages = [turn['user_message'] for page in pages.values() for turn in reversed(page['history'])]
+    assert messages == [f'turn {i}' for i in reversed(range(TURNS))]
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='needs node to run the page script')
+def test_history_sidebar_loads_older_pages_down_to_the_oldest_turn(history_client):
+    with open(TEMPLATE, encoding='utf-8') as f:
+        template = f.read()
+    code = re.search(r'let lastHistoryDate = null;.*?(?=\n\s*function formatDate)', template, re.S).group(0)
+    pages = history_pages(history_client)
+    script = HARNESS % {'pages': json.dumps(pages), 'code': code}
+    result = subprocess.run(['node', '-e', script], capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    shown = json.loads(result.stdout)
+    assert shown == [f'turn {i}' for i in reversed(range(TURNS))]
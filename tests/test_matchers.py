@@ -0,0 +1,42 @@
+import numpy as np
+
+from chatbot.matchers import IntentIndex, QuestionIndex, SpellingCorrector
+
+
+def test_top_k_orders_by_score_then_row():
+    scores = np.array([0.2, 0.9, 0.2, 0.5, 0.2])
+    assert QuestionIndex.top_k_from_scores(scores, 3) == [(1, 0.9), (3, 0.5), (0, 0.2)]
+
+
+def test_top_k_skips_rows_scoring_zero():
+    scores = np.zeros(1000)
+    scores[7] = 0.4
+    assert QuestionIndex.top_k_from_scores(scores, 3) == [(7, 0.4)]
+
+
+def test_top_k_is_empty_when_nothing_scores():
+    assert QuestionIndex.top_k_from_scores(np.zeros(1000), 3) == []
+
+
+def test_intent_index_round_trips_through_tables():
+    intents = [
+        {'tag': 'fees', 'patterns': ['fee structure', 'how much are the fees']},
+        {'tag': 'exam', 'patterns': ['exam date', 'when is the exam']},
+    ]
+    index = IntentIndex(intents)
+    loaded = IntentIndex.from_tables(intents, **index.to_tables())
+    for message in ('what is the fee structure', 'exam date please', 'hostel'):
+        assert loaded.best_match(message) == index.best_match(message)
+    assert loaded.best_match('exam date')[0]['tag'] == 'exam'
+
+
+def test_spelling_corrector_round_trips_through_tables():
+    corrector = SpellingCorrector(['examination schedule', 'scholarship form', 'examination result'])
+    tables = corrector.to_tables()
+    loaded = SpellingCorrector.from_tables(
+        tables['words'], tables['frequencies'], tables['delete_keys'],
+        tables['delete_indptr'], tables['delete_word_ids'], **tables['settings'],
+    )
+    for text in ('examinaton shedule', 'scholarshp', 'result'):
+        assert loaded.correct(text) == corrector.correct(text)
+    assert loaded.correct('examinaton') == 'examination'
@@ -0,0 +1,16 @@
+import chatbot.chatbot as bot
+
+
+def test_batch_records_each_message_under_its_route(admin_client):
+    bot.metrics.reset()
+    bot.response_cache.clear()
+    messages = ['fee structure btech', 'fee structure btech', 'how do I apply for a hostel room']
+    replies = bot.get_bot_replies(messages)
+
+    answered_by = admin_client.get('/admin/chatbot_metrics').get_json()['answered_by']
+    assert 'batch' not in answered_by
+    assert sum(histogram['count'] for histogram in answered_by.values()) == len(messages)
+    assert answered_by['cache']['count'] == 1
+    assert answered_by[replies[0]['route']]['count'] >= 1
+    assert answered_by[replies[2]['route']]['count'] >= 1
+    bot.response_cache.clear()
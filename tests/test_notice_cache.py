@@ -0,0 +1,64 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from chatbot.notice_cache import NoticeCache
+from utils import PTUUtils
+
+NOTICES_PAGE = b"""<html><body><ul class="notice-board">
+<li><a href="/notice/1.pdf">Date sheet for May exams</a><span class="date">01/05/2024</span></li>
+<li><a href="/notice/2.pdf">Scholarship forms open</a><span class="date">02/05/2024</span></li>
+</ul></body></html>"""
+EMPTY_PAGE = b"<html><body><p>Site under maintenance</p></body></html>"
+
+FALLBACK = [{'title': 'Stored notice', 'link': '#', 'date': '30/04/2024'}]
+
+
+@pytest.fixture
+def noticeboard():
+    """A local stand-in for the PTU site; set .page to change what /notices returns."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.server.requests += 1
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.end_headers()
+            self.wfile.write(self.server.page)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.page = NOTICES_PAGE
+    server.requests = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def notice_cache_for(server):
+    utils = PTUUtils()
+    utils.base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    return NoticeCache(lambda: utils.fetch_notices(timeout=5), fallback=lambda: FALLBACK)
+
+
+def test_refresh_serves_fetched_notices(noticeboard):
+    cache = notice_cache_for(noticeboard)
+    assert cache.notices is None and noticeboard.requests == 0
+    assert cache.refresh()
+    assert [notice['link'] for notice in cache.notices] == ['/notice/1.pdf', '/notice/2.pdf']
+    assert cache.notices[0]['date'] == '01/05/2024'
+    assert noticeboard.requests == 1
+
+
+def test_empty_fetch_keeps_serving_the_fallback(noticeboard):
+    noticeboard.page = EMPTY_PAGE
+    cache = notice_cache_for(noticeboard)
+    assert not cache.refresh()
+    assert cache.notices is None
+    assert cache.failures == 1
+    assert cache.get() == FALLBACK
+    cache.stop()
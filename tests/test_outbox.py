@@ -0,0 +1,157 @@
+import os
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from email.mime.text import MIMEText
+
+import pytest
+
+from chatbot.outbox import Outbox
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: no TLS, no auth."""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply('220 stub ESMTP')
+        for line in self.rfile:
+            command = line.decode().strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250 stub')
+            elif command.startswith(('MAIL', 'RCPT', 'RSET', 'NOOP')):
+                self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                for line in self.rfile:
+                    if line == b'.\r\n':
+                        break
+                    data.append(line)
+                if server.throttle:
+                    server.throttle -= 1
+                    self.reply('421 Too many messages, try again later')
+                    return
+                server.messages.append(b''.join(data))
+                self.reply('250 Queued')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Not implemented')
+
+
+@pytest.fixture
+def smtp_servers():
+    """start() runs a local SMTP server; set .throttle to answer that many messages with 421."""
+    servers = []
+
+    def start():
+        server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), SMTPHandler)
+        server.daemon_threads = True
+        server.connections = 0
+        server.messages = []
+        server.throttle = 0
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def smtp_server(smtp_servers):
+    return smtp_servers()
+
+
+@pytest.fixture
+def outbox(smtp_server, tmp_path):
+    outbox = Outbox('127.0.0.1', smtp_server.server_address[1], starttls=False,
+                    path=str(tmp_path / 'outbox.db'), base_delay=0.05, timeout=5)
+    yield outbox
+    outbox.stop()
+
+
+def message(i):
+    msg = MIMEText(f'Support request {i}')
+    msg['From'] = 'portal@example.com'
+    msg['To'] = 'support@example.com'
+    msg['Subject'] = f'Request {i}'
+    return msg
+
+
+def wait_for_sent(outbox, count, timeout=10):
+    deadline = time.monotonic() + timeout
+    while outbox.stats()['sent'] < count:
+        assert time.monotonic() < deadline, outbox.stats()
+        time.sleep(0.02)
+
+
+def test_queued_messages_share_one_connection(outbox, smtp_server):
+    for i in range(5):
+        outbox.enqueue(message(i))
+    wait_for_sent(outbox, 5)
+    assert smtp_server.connections == 1
+    assert len(smtp_server.messages) == 5
+    received = b''.join(smtp_server.messages)
+    assert all(b'Support request %d' % i in received for i in range(5))
+    assert outbox.stats()['pending'] == 0
+
+
+def test_throttled_message_is_retried_on_a_new_connection(outbox, smtp_server):
+    smtp_server.throttle = 1
+    for i in range(3):
+        outbox.enqueue(message(i))
+    wait_for_sent(outbox, 3)
+    assert smtp_server.connections == 2
+    assert len(smtp_server.messages) == 3
+    stats = outbox.stats()
+    assert stats['failed'] == 0 and stats['last_error'] is None
+
+
+
+
+def test_outboxes_only_send_their_own_accounts_messages(smtp_servers, tmp_path, monkeypatch):
+    path = str(tmp_path / 'shared.db')
+    portal_server, support_server = smtp_servers(), smtp_servers()
+    portal = Outbox('127.0.0.1', portal_server.server_address[1], starttls=False, path=path, timeout=5)
+    support = Outbox('127.0.0.1', support_server.server_address[1], starttls=False, path=path, timeout=5)
+    # No sender threads: each outbox sends only when send_due() is called
+    for outbox in (portal, support):
+        monkeypatch.setattr(outbox, 'start', lambda: None)
+        outbox._wake = threading.Event()
+    for i in range(3):
+        support.enqueue(message(f'support {i}'))
+        portal.enqueue(message(f'portal {i}'))
+
+    assert portal.send_due() == 3
+    assert len(portal_server.messages) == 3 and all(b'portal' in data for data in portal_server.messages)
+    assert support.stats() == dict(support.stats(), pending=3, sent=0)
+    assert support.send_due() == 3
+    assert len(support_server.messages) == 3 and all(b'support' in data for data in support_server.messages)
+    portal._disconnect()
+    support._disconnect()
+
+
+def test_portal_chatbot_script_imports_the_outbox_package():
+    # As `python student_portal/chatbot.py` would, without starting the server
+    script = (
+        "import runpy, sys\n"
+        "sys.path[0] = 'student_portal'\n"
+        "names = runpy.run_path('student_portal/chatbot.py', run_name='portal_chatbot')\n"
+        "import chatbot.outbox\n"
+        "assert names['Outbox'] is chatbot.outbox.Outbox\n"
+        "assert 'outbox' not in sys.modules\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-c', script], cwd=root, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,47 @@
+import types
+
+import pytest
+
+import chatbot.chatbot as bot
+
+
+@pytest.fixture
+def routed(monkeypatch):
+    """Route messages through a stub that records what it was asked."""
+    seen = []
+
+    def route_message(user_message, kb=None, trace=None):
+        seen.append(user_message)
+        return bot.make_reply(f'reply to {user_message}', 'responses',
+                              [{'question': user_message, 'score': 1.0}])
+
+    monkeypatch.setattr(bot, 'get_knowledge_base', lambda: types.SimpleNamespace(version='test'))
+    monkeypatch.setattr(bot, 'route_message', route_message)
+    bot.response_cache.clear()
+    yield seen
+    bot.response_cache.clear()
+
+
+def test_messages_routed_differently_have_different_keys():
+    assert bot.reply_cache_key('time-table btech') != bot.reply_cache_key('timetable btech')
+    assert bot.reply_cache_key('  Timetable BTech ') == bot.reply_cache_key('timetable btech')
+
+
+def test_cached_reply_is_not_shared_with_callers(routed):
+    first = bot.get_bot_reply('hello there')
+    first['response'] = 'changed'
+    first['suggestions'][0]['question'] = 'changed'
+
+    second = bot.get_bot_reply('Hello there')
+    assert routed == ['hello there']
+    assert second['response'] == 'reply to hello there'
+    assert second['suggestions'] == [{'question': 'hello there', 'score': 1.0}]
+    assert second is not bot.get_bot_reply('hello there')
+
+
+def test_batch_duplicates_get_their_own_copies(routed, monkeypatch):
+    monkeypatch.setattr(bot, 'correct_spelling', lambda message, kb, trace=None: message)
+    monkeypatch.setattr(bot, 'match_rules', lambda message, kb, trace=None: bot.make_reply(message, 'responses'))
+    replies = bot.get_bot_replies(['same', 'same'])
+    replies[0]['response'] = 'changed'
+    assert replies[1]['response'] == 'same'
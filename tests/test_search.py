@@ -0,0 +1,45 @@
+import sqlite3
+from datetime import datetime
+
+
+def test_search_works_on_a_database_the_app_created(portal, portal_user, client):
+    with portal.app.app_context():
+        portal.db.session.add(portal.SupportTicket(user_id=portal_user, subject='Hostel fee refund',
+                                                   message='When is the refund paid?'))
+        portal.db.session.add(portal.Notice(title='Hostel allotment list', title_key='hostel allotment list',
+                                            link='#', date_posted=datetime(2024, 5, 1)))
+        portal.db.session.commit()
+
+    response = client.get('/search?q=hostel')
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [ticket['subject'] for ticket in results['tickets']] == ['<mark>Hostel</mark> fee refund']
+    assert len(results['notices']) == 1
+
+
+def test_chat_turns_are_indexed_by_the_writer(portal, portal_user, client):
+    portal.insert_chat_history([
+        {'user_id': portal_user, 'message': f'question {i} about convocation', 'response': 'Answer',
+         'timestamp': datetime(2024, 5, 1)}
+        for i in range(450)
+    ])
+    conn = sqlite3.connect(portal.DATABASE_PATH)
+    try:
+        triggers = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    finally:
+        conn.close()
+    assert 'chat_history_fts_insert' not in triggers
+
+    response = client.get('/search?q=convocation&scope=chat&limit=50')
+    assert response.status_code == 200
+    assert len(response.get_json()['results']['chat']) == 50
+
+
+def test_admin_searches_every_users_tickets(portal, portal_user, admin_client):
+    with portal.app.app_context():
+        portal.db.session.add(portal.SupportTicket(user_id=portal_user, subject='Migration certificate',
+                                                   message='Need it urgently'))
+        portal.db.session.commit()
+    response = admin_client.get(f'/admin/search?q=migration&user_id={portal_user}')
+    assert response.status_code == 200
+    assert len(response.get_json()['results']['tickets']) == 1
@@ -0,0 +1,21 @@
+import threading
+
+from write_behind import WriteBehindBuffer
+
+
+def test_concurrent_start_runs_one_flusher():
+    buffer = WriteBehindBuffer(lambda rows: None, name='test-writer')
+    barrier = threading.Barrier(8)
+
+    def start():
+        barrier.wait()
+        buffer.start()
+
+    threads = [threading.Thread(target=start) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(thread.name == 'test-writer' for thread in threading.enumerate()) == 1
+    buffer.close()
+
@@ -153,27 +153,33 @@ class PTUUtils:
         except KeyError:
             return None
 
-    def get_notices(self, limit=10):
+    def fetch_notices(self, limit=10, timeout=5):
+        """Scrape notices from PTU website; raises if the site cannot be read."""
+        response = requests.get(f"{self.base_url}/notices", timeout=timeout)
+        if response.status_code != 200:
+            response.raise_for_status()
+            return []
+        
+        soup = BeautifulSoup(response.text, 'html.parser')
+        notices = []
+        
+        # Adjust these selectors based on PTU website structure
+        notice_elements = soup.select('.notice-board li')  # Update selector as per actual website
+        
+        for element in notice_elements[:limit]:
+            notice = {
+                'title': element.get_text(strip=True),
+                'link': element.find('a')['href'] if element.find('a') else None,
+                'date': element.find('span', class_='date').text if element.find('span', class_='date') else None
+            }
+            notices.append(notice)
+        
+        return notices
+
+    def get_notices(self, limit=10, timeout=5):
         """Scrape notices from PTU website."""
         try:
-            response = requests.get(f"{self.base_url}/notices")
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                notices = []
-                
-                # Adjust these selectors based on PTU website structure
-                notice_elements = soup.select('.notice-board li')  # Update selector as per actual website
-                
-                for element in notice_elements[:limit]:
-                    notice = {
-                        'title': element.get_text(strip=True),
-                        'link': element.find('a')['href'] if element.find('a') else None,
-                        'date': element.find('span', class_='date').text if element.find('span', class_='date') else None
-                    }
-                    notices.append(notice)
-                
-                return notices
-            return []
+            return self.fetch_notices(limit, timeout)
         except Exception as e:
             print(f"Error scraping notices: {str(e)}")
             return []
@@ -189,7 +195,9 @@ class PTUUtils:
             if notice['date']:
                 response += f"   Date: {notice['date']}\n"
             if notice['link']:
-                response += f"   Link: {self.base_url}{notice['link']}\n"
+                # Links stored from the noticeboard are already absolute
+                link = notice['link'] if notice['link'].startswith('http') else f"{self.base_url}{notice['link']}"
+                response += f"   Link: {link}\n"
             response += "\n"
         
         return response
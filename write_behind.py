@@ -0,0 +1,121 @@
+import atexit
+import os
+import threading
+import weakref
+
+# Buffers of this process; their locks and thread are replaced in a forked child
+_buffers = weakref.WeakSet()
+# Serialises start(), so two requests cannot both start a flusher thread
+_start_lock = threading.Lock()
+
+
+def _after_fork_in_child():
+    global _start_lock
+    # Locks held by another thread at the fork stay held forever in the
+    # child, and the flusher threads were not copied
+    _start_lock = threading.Lock()
+    for buffer in list(_buffers):
+        buffer._lock = threading.Lock()
+        buffer._flush_lock = threading.Lock()
+        buffer._thread = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+class WriteBehindBuffer:
+    """Collect rows in memory and write them to the database in batches.
+
+    append() only adds the row to a list, so a request does not wait on the
+    disk. A background thread hands the collected rows to write(rows) every
+    `max_delay` seconds, or as soon as `max_rows` are waiting; write should
+    store them in one transaction. flush() writes immediately, and runs at
+    interpreter exit, so a clean shutdown loses nothing.
+
+    Bound on data loss: if the process is killed without running its exit
+    handlers (SIGKILL, out of memory, power loss), the rows appended in the
+    last `max_delay` seconds, at most `max_rows` of them plus any still
+    being written, are lost. If writes keep failing, rows are kept and
+    retried, but beyond `max_pending` the oldest are dropped and counted
+    in `dropped`.
+    """
+
+    def __init__(self, write, max_rows=100, max_delay=1.0, max_pending=10000, name='write-behind'):
+        self.write = write
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.name = name
+        self.written = 0
+        self.dropped = 0
+        self._rows = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        self._wake = None
+        self._stopped = None
+        _buffers.add(self)
+        atexit.register(self.close)
+
+    def start(self):
+        """Start the flusher thread for this process if it is not running."""
+        if self._thread is not None:
+            return
+        with _start_lock:
+            if self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._wake = threading.Event()
+            self._stopped = threading.Event()
+            thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            thread.start()
+            self._thread = thread
+
+    def append(self, row):
+        self.start()
+        with self._lock:
+            self._rows.append(row)
+            full = len(self._rows) >= self.max_rows
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        stopped = self._stopped
+        wake = self._wake
+        while not stopped.is_set():
+            wake.wait(self.max_delay)
+            wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write every buffered row now; return how many were written."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+            if not rows:
+                return 0
+            try:
+                self.write(rows)
+            except Exception as e:
+                print(f"Error writing {len(rows)} buffered rows ({self.name}): {e}")
+                with self._lock:
+                    # Put them back in front of newer rows and retry on the next flush
+                    self._rows[:0] = rows
+                    overflow = len(self._rows) - self.max_pending
+                    if overflow > 0:
+                        del self._rows[:overflow]
+                        self.dropped += overflow
+                return 0
+            self.written += len(rows)
+            return len(rows)
+
+    def close(self):
+        """Stop the flusher thread and write what is left."""
+        if self._stopped is not None:
+            self._stopped.set()
+            self._wake.set()
+        self._thread = None
+        if self._pid == os.getpid():
+            self.flush()